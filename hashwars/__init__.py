@@ -4,4 +4,32 @@ from .agent import *
 from .blockchain import *
 from .miners import *
 from .simulate import *
-from .plot import *
+from .cache import *
+from .scenario import *
+from .trajectory import *
+from .probe import *
+
+#
+# Plotting (which loads matplotlib) and the ensemble engine (which
+# loads NumPy) are imported when one of their names is first used, so
+# simulations and worker processes start quickly.
+#
+
+_LAZY_MODULES = {
+    'plot': ('plot', 'write_plot', 'moving_average', 'format_percent', 'COLORS'),
+    'ensemble': ('launch_ensemble', 'MINORITY', 'MAJORITY'),
+}
+
+_LAZY_NAMES = {name: module_name for module_name, names in _LAZY_MODULES.items() for name in names}
+
+def __getattr__(name):
+    if name not in _LAZY_NAMES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    from importlib import import_module
+    module_name = _LAZY_NAMES[name]
+    module = import_module('.' + module_name, __name__)
+    # Importing `hashwars.plot` sets `plot` to the module, so this
+    # must come after.
+    for lazy_name in _LAZY_MODULES[module_name]:
+        globals()[lazy_name] = getattr(module, lazy_name)
+    return globals()[name]
@@ -1,46 +1,69 @@
-from itertools import chain
+from math import dist
+from numbers import Real
 
-from hashwars.state import log
+from hashwars.state import log, log_enabled, schedule_reaction
+from hashwars.trajectory import Trajectory
 
 class Agent(object):
 
     def __init__(self, id, location, active=True):
         self.id = id
-        self.location = location
+        # An agent given a trajectory moves along it (and its
+        # `location` is where it starts, at time 0).
+        if isinstance(location, Trajectory):
+            self.trajectory = location
+            self.location = location.position(0.0)
+        else:
+            self.trajectory = None
+            self.location = location
         self.transmissions_received = {}
         self.active = active
         self.priority = 0
+        # Stepped agents are advanced over every interval of time;
+        # all others only act at the times they schedule.
+        self.stepped = False
+        self.scheduled_action = None
 
     def __str__(self):
         return self.id
 
     def log_advance(self, duration):
-        log("AGENT {} ADVANCE w/ {}".format(self.id, [transmission.id for transmission in self.transmissions_received.values()]))
+        if not log_enabled(): return
+        log("AGENT {} ADVANCE w/ {}", self.id, [transmission.id for transmission in self.transmissions_received.values()])
 
+    # Receptions are queued as events (see `receive`), so advancing a
+    # stepped agent only takes its actions.
     def advance(self, duration):
         self.log_advance(duration)
-        for action in sorted(
-                chain(
-                    self.actions_for(duration),
-                    list(self.transmissions_received.items())),
-                key=lambda action: action[0]):
-            if action[1] is not None:
-                self.react(action[0], action[1])
-            else:
-                self.act(action[0])
+        for time, transmission in sorted(self.actions_for(duration), key=lambda action: action[0]):
+            self.act(time)
 
     def actions_for(self, duration):
         return []
 
+    def next_action_time(self, time):
+        return None
+
+    def location_at(self, time):
+        if self.trajectory is None:
+            return self.location
+        return self.trajectory.position(time)
+
     def distance_to(self, location):
-        return abs(self.location - location)
+        # Locations are numbers in one-dimensional space and vectors
+        # in two or three.
+        if isinstance(self.location, Real):
+            return abs(self.location - location)
+        return dist(self.location, location)
 
     def receive(self, time, transmission):
-        log("AGENT {} RECEIVE {}".format(self.id, transmission.id))
+        log("AGENT {} RECEIVE {}", self.id, transmission.id)
         self.transmissions_received[time] = transmission
+        schedule_reaction(time, self, transmission)
 
     def act(self, time):
         pass
 
     def react(self, time, transmission):
-        self.transmissions_received = {time:t for time,t in self.transmissions_received.items() if t != transmission}
+        if self.transmissions_received.get(time) is transmission:
+            del self.transmissions_received[time]
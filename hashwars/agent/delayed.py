@@ -12,3 +12,8 @@ class DelayedAgent(Agent):
         if duration.contains(self.act_at):
             actions.append([(self.act_at, None)])
         return actions
+
+    def next_action_time(self, time):
+        if not self.active: return None
+        if self.act_at > time:
+            return self.act_at
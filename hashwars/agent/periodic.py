@@ -29,3 +29,9 @@ class PeriodicAgent(Agent):
             num_actions_before_start = floor((duration.start - self.start_at) / self.period)
             last_action_at =  self.start_at + (num_actions_before_start * self.period)
             return floor((duration.end - last_action_at) / self.period)
+
+    def next_action_time(self, time):
+        if not self.active: return None
+        if self.start_at > time:
+            return self.start_at
+        return self.start_at + ((floor((time - self.start_at) / self.period) + 1) * self.period)
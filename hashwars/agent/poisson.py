@@ -1,46 +1,45 @@
-from math import exp, factorial
-from random import random
+from hashwars.utils import ExponentialSampler
+from hashwars.state import current_random
 
 from .base import Agent
 
 # https://towardsdatascience.com/the-poisson-distribution-and-poisson-process-explained-4e2cb17d459
 class PoissonAgent(Agent):
 
-    MAX_FACTORIAL = 1000 # boot time cost
-    FACTORIALS = [factorial(k) for k in range(MAX_FACTORIAL)]
-    MAX_ACTIONS = 10
-
-    def __init__(self, id, location, max_actions_per_advance=None, active=True):
+    def __init__(self, id, location, max_actions_per_advance=None, active=True, sampler=None):
         Agent.__init__(self, id, location, active=active)
-        self.max_actions_per_advance = (max_actions_per_advance if max_actions_per_advance is not None else self.MAX_ACTIONS)
-        assert self.max_actions_per_advance <= self.MAX_FACTORIAL
-    
+        self.max_actions_per_advance = max_actions_per_advance
+        self.sampler = (sampler if sampler is not None else ExponentialSampler(generator=current_random()))
+
     def actions_for(self, duration):
         actions = []
         if not self.active: return actions
-        for action in range(self.number_of_actions_for(duration)):
-            actions.append((duration.random_time(), None))
+        for time in self.action_times_for(duration):
+            actions.append((time, None))
         return actions
 
+    def action_times_for(self, duration):
+        # Waiting times between the events of a Poisson process are
+        # exponentially distributed, so drawing them one after another
+        # gives the exact number of events at any duration.
+        times = []
+        mean_time_between_actions = self.mean_time_between_actions()
+        time = duration.start + (mean_time_between_actions * self.sampler.draw())
+        while time <= duration.end:
+            if self.max_actions_per_advance is not None and len(times) >= self.max_actions_per_advance:
+                break
+            times.append(time)
+            time += (mean_time_between_actions * self.sampler.draw())
+        return times
+
     def number_of_actions_for(self, duration):
-        # This is the constant 'lambda' for the given `duration`
-        l = (1 / self.mean_time_between_actions()) * duration.length
-        # We truncate at a maximum value of k
-        k_max = self.max_actions_per_advance
-        # These are the probabilities p_k for k events to occur in the
-        # given `duration`
-        probabilities = [exp(-1 * l) * (pow(l, k) / self.FACTORIALS[k]) for k in range(k_max)]
-        # Draw a random value in (0,1)
-        r = random()
-        # Return first k for which the partial sum of p_j {j=0..k} is less than r
-        for k, p_k in enumerate(probabilities):
-            if r <= p_k:
-                return k
-            else:
-                r -= p_k
-        # If we reach this point, just return the max k -- this is an
-        # approximation, but we shouldn't reach here frequently anyway
-        return k_max
+        return len(self.action_times_for(duration))
+
+    def next_action_time(self, time):
+        if not self.active: return None
+        # The waiting time is memoryless, so it can be redrawn whenever
+        # the agent is rescheduled.
+        return time + (self.mean_time_between_actions() * self.sampler.draw())
 
     def mean_time_between_actions(self):
         return 1.0
@@ -1,2 +1,2 @@
 from .block import Block
-from .blockchain import Blockchain, BlockchainTransmission
+from .blockchain import Blockchain, BlockchainTransmission, BlockTransmission
@@ -1,23 +1,34 @@
-from typing import Optional
+from typing import Optional, Union
 
-from hashwars.utils import random_string
+from hashwars.state import next_block_id
 
 class Block():
-    
-    def __init__(self, id:str, previous:'Block', difficulty:float, height:Optional[int]=None, time:Optional[float]=None):
+
+    # Simulations create a great many blocks, so they have no
+    # per-instance `__dict__`.
+    __slots__ = ('id', 'previous', 'difficulty', 'height', 'time', 'producer', 'chain_weight', 'epoch_start_time', 'next_difficulty')
+
+    def __init__(self, id:Union[int, str], previous:'Block', difficulty:float, height:Optional[int]=None, time:Optional[float]=None, producer:Optional[str]=None):
         self.id = id
         self.previous = previous
         self.difficulty = difficulty
         self.height = height
         self.time = time
+        self.producer = producer
+        # Total weight of the chain ending in this block, the time its
+        # difficulty epoch started, and the difficulty required of the
+        # next block, set when the block is linked into a blockchain.
+        self.chain_weight = None
+        self.epoch_start_time = None
+        self.next_difficulty = None
 
     def __str__(self):
         height_info = " ({})".format(self.height) if self.height is not None else ""
         return "[{} : {}{}]".format(self.id, self.difficulty, height_info)
 
     @classmethod
-    def new_id(self) -> str:
-        return random_string(8)
+    def new_id(self) -> int:
+        return next_block_id()
 
     @property
     def weight(self) -> float:
@@ -29,4 +40,5 @@ class Block():
             previous=self.previous, 
             difficulty=self.difficulty, 
             time=self.time,
+            producer=self.producer,
             height=(self.height if include_height else None))
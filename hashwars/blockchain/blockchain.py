@@ -1,8 +1,6 @@
-from typing import Optional
+from typing import Optional, List, Dict
 
-from numpy import mean
-
-from hashwars.state import log
+from hashwars.state import log, LOG_INFO, emit, BLOCK_ACCEPTED, CHAIN_REORGANIZED
 from hashwars.agent import Agent, Transmission
 
 from .block import Block
@@ -15,7 +13,8 @@ class Blockchain():
                  block_time: Optional[float] = 600.0, 
                  difficulty_readjustment_period: Optional[int] = 2016, 
                  initial_difficulty: Optional[float] = 600.0, 
-                 max_difficulty_change_factor: Optional[int] = 4):
+                 max_difficulty_change_factor: Optional[int] = 4,
+                 retarget: Optional[bool] = False):
 
         assert genesis_block.height == 1
         assert genesis_block.previous is None
@@ -24,35 +23,107 @@ class Blockchain():
         assert difficulty_readjustment_period > 0
         assert initial_difficulty > 0
         assert max_difficulty_change_factor > 0
+        assert difficulty_readjustment_period > 1 or not retarget
+        # Retargeting measures epochs from the genesis block's time.
+        assert genesis_block.time is not None or not retarget
 
         self.id = id
         self.genesis_block = genesis_block
+        # Blockchains may share a genesis block, which the first one
+        # sets up; the others must agree with it.
+        if self.genesis_block.chain_weight is None:
+            self.genesis_block.chain_weight = self.genesis_block.weight
+            self.genesis_block.epoch_start_time = self.genesis_block.time
+            self.genesis_block.next_difficulty = initial_difficulty
+        assert self.genesis_block.next_difficulty == initial_difficulty, "Genesis block {} already has initial difficulty {}".format(self.genesis_block.id, self.genesis_block.next_difficulty)
         self.block_time = block_time
 
-        self.blocks  = {}
-        self.blocks[self.genesis_block.id] = self.genesis_block
-        self.heights = [self.genesis_block.id]
-        self.height = len(self.heights)
-        self.weight = self.genesis_block.difficulty
+        # Blocks are immutable and link to their parents, so a
+        # blockchain is just a pointer to its tip and can share all of
+        # its blocks with any other blockchain.
+        self.tip = self.genesis_block
+        self._blocks_by_height = None
+
+        # IDs of every block connected to this blockchain's tree (built
+        # from the main chain the first time blocks are received one by
+        # one), and blocks received before their parents, by the ID of
+        # the parent they are waiting for.
+        self._known_block_ids = None
+        self.orphans = {}
+
+        # Running totals of the weight each producer contributed to
+        # this chain.
+        self.weights_by_producer = {self.genesis_block.producer: self.genesis_block.weight}
 
+        # With `retarget`, the difficulty is readjusted every
+        # `difficulty_readjustment_period` blocks (otherwise it stays
+        # at the genesis block's `next_difficulty`).
         self.difficulty_readjustment_period = difficulty_readjustment_period
-        self.difficulty = initial_difficulty
         self.max_difficulty_change_factor = max_difficulty_change_factor
         self.inverse_max_difficulty_change_factor = (1/self.max_difficulty_change_factor)
+        self.retarget = retarget
 
         self.chain_params = (
             self.genesis_block.id,
             self.block_time,
             self.difficulty_readjustment_period,
             self.max_difficulty_change_factor,
+            self.retarget,
         )
 
     def __str__(self):
         return "{{{} | {} => {} | {} {}}}".format(self.id, self.tip.id, self.tip.previous.id if self.tip.previous else '.', self.weight, self.height)
 
     @property
-    def tip(self) -> Block:
-        return self.blocks[self.heights[-1]]
+    def height(self) -> int:
+        return self.tip.height
+
+    @property
+    def weight(self) -> float:
+        return self.tip.chain_weight
+
+    @property
+    def difficulty(self) -> float:
+        return self.tip.next_difficulty
+
+    @property
+    def blocks_by_height(self) -> List[Block]:
+        # Materialized lazily, only when a full index is requested.
+        if self._blocks_by_height is None:
+            blocks = []
+            block = self.tip
+            while block is not None:
+                blocks.append(block)
+                block = block.previous
+            blocks.reverse()
+            self._blocks_by_height = blocks
+        return self._blocks_by_height
+
+    @property
+    def heights(self) -> List[str]:
+        return [block.id for block in self.blocks_by_height]
+
+    @property
+    def blocks(self) -> Dict[str, Block]:
+        return {block.id:block for block in self.blocks_by_height}
+
+    def block_at(self, height: int) -> Optional[Block]:
+        if height < 1 or height > self.height:
+            return None
+        if self._blocks_by_height is not None:
+            return self._blocks_by_height[height - 1]
+        block = self.tip
+        while block.height > height:
+            block = block.previous
+        return block
+
+    def contains(self, block: Block) -> bool:
+        if block.height is None:
+            return False
+        return self.block_at(block.height) is block
+
+    def weight_produced_by(self, producer: str) -> float:
+        return self.weights_by_producer.get(producer, 0)
 
     def copy(self) -> 'Blockchain':
         blockchain = Blockchain(
@@ -60,53 +131,134 @@ class Blockchain():
             genesis_block=self.genesis_block,
             block_time=self.block_time,
             difficulty_readjustment_period=self.difficulty_readjustment_period,
-            initial_difficulty=self.difficulty,
-            max_difficulty_change_factor=self.max_difficulty_change_factor)
-        blockchain.blocks = {block_id:block for (block_id, block) in self.blocks.items()}
-        blockchain.heights = [block_id for block_id in self.heights]
-        blockchain.height  = self.height
-        blockchain.weight = self.weight
+            initial_difficulty=self.genesis_block.next_difficulty,
+            max_difficulty_change_factor=self.max_difficulty_change_factor,
+            retarget=self.retarget)
+        blockchain.tip = self.tip
+        blockchain.weights_by_producer = dict(self.weights_by_producer)
         return blockchain
 
     def merge(self, other: 'Blockchain') -> bool:
-        log("BLOCKCHAIN {} MERGING {}".format(self, other))
+        log("BLOCKCHAIN {} MERGING {}", self, other)
 
         assert other.chain_params == self.chain_params
 
         if other.weight < self.weight:
-            log("BLOCKCHAIN {} REJECT {} AS LIGHTER CHAIN".format(self, other))
+            log("BLOCKCHAIN {} REJECT {} AS LIGHTER CHAIN", self, other)
             return False
 
-        log("BLOCKCHAIN {} ACCEPT {}".format(self, other))
-        self.blocks = {block_id:block for (block_id, block) in other.blocks.items()}
-        self.heights = [block_id for block_id in other.heights]
-        self.height = other.height
-        self.weight = other.weight
-        self.difficulty = other.difficulty
+        log("BLOCKCHAIN {} ACCEPT {}", self, other)
+        # Each block records the difficulty which follows it, so the
+        # new tip brings its own.
+        self._reorganize(other.tip)
         return True
+
+    def receive_block(self, block: Block) -> bool:
+        """Connects a block received on its own to this blockchain's
+        tree, along with any orphans waiting for it.
+
+        Switches to the heaviest chain among them if it is at least
+        as heavy as the current one (as `merge` does).  Returns whether
+        the tip changed.
+        """
+        known_block_ids = self.known_block_ids
+        if block.id in known_block_ids:
+            return False
+        if block.previous.id not in known_block_ids:
+            log("BLOCKCHAIN {} ORPHAN {}", self, block)
+            self.orphans.setdefault(block.previous.id, []).append(block)
+            return False
+
+        reorganized = False
+        blocks = [block]
+        while blocks:
+            block = blocks.pop()
+            if block.difficulty < block.previous.next_difficulty:
+                log("BLOCKCHAIN {} REJECT {} TOO LIGHT {} < {}", self, block, block.difficulty, block.previous.next_difficulty)
+                self._drop_orphans_of(block)
+                continue
+            known_block_ids.add(block.id)
+            blocks.extend(self.orphans.pop(block.id, ()))
+            if block.chain_weight >= self.weight:
+                log("BLOCKCHAIN {} ACCEPT {}", self, block)
+                self._reorganize(block)
+                reorganized = True
+        return reorganized
+
+    # Orphans descending from a rejected block can never connect.
+    def _drop_orphans_of(self, block):
+        blocks = [block]
+        while blocks:
+            for orphan in self.orphans.pop(blocks.pop().id, ()):
+                log("BLOCKCHAIN {} DROP ORPHAN {}", self, orphan)
+                blocks.append(orphan)
+
+    @property
+    def known_block_ids(self):
+        if self._known_block_ids is None:
+            self._known_block_ids = set(self.heights)
+        return self._known_block_ids
+
+    def _reorganize(self, new_tip: Block):
+        # Only the blocks between each tip and their common ancestor
+        # change the weights by producer.
+        old_tip = old_block = self.tip
+        new_block = new_tip
+        while old_block.height > new_block.height:
+            self._count_weight(old_block, -1)
+            old_block = old_block.previous
+        while new_block.height > old_block.height:
+            self._count_weight(new_block, 1)
+            self._know(new_block)
+            new_block = new_block.previous
+        while old_block is not new_block:
+            self._count_weight(old_block, -1)
+            self._count_weight(new_block, 1)
+            self._know(new_block)
+            old_block = old_block.previous
+            new_block = new_block.previous
+        self.tip = new_tip
+        self._blocks_by_height = None
+        emit(CHAIN_REORGANIZED, self, old_tip, new_tip)
+
+    def _know(self, block: Block):
+        if self._known_block_ids is not None:
+            self._known_block_ids.add(block.id)
+
+    def _count_weight(self, block: Block, sign: int):
+        self.weights_by_producer[block.producer] = self.weights_by_producer.get(block.producer, 0) + (sign * block.weight)
         
     def add(self, block: Block) -> bool:
-        log("BLOCKCHAIN {} ADDING {}".format(self, block))
+        log("BLOCKCHAIN {} ADDING {}", self, block)
         if block.difficulty < self.difficulty:
-            log("BLOCKCHAIN {} REJECT {} TOO LIGHT {} < {}".format(self, block, block.difficulty, self.difficulty))
+            log("BLOCKCHAIN {} REJECT {} TOO LIGHT {} < {}", self, block, block.difficulty, self.difficulty)
             return False
-        if block.previous.id != self.tip.id:
-            if block.previous.id in self.blocks:
-                log("BLOCKCHAIN {} REJECT {} STALE".format(self, block))
+        if block.previous is not self.tip:
+            if self.contains(block.previous):
+                log("BLOCKCHAIN {} REJECT {} STALE", self, block)
             else:
-                log("BLOCKCHAIN {} REJECT {} UNKNOWN TIP {}".format(self, block, block.previous.id))
+                log("BLOCKCHAIN {} REJECT {} UNKNOWN TIP {}", self, block, block.previous.id)
             return False
 
-        log("BLOCKCHAIN {} ACCEPT {}".format(self, block))
-        self.blocks[block.id] = block
-        self.heights.append(block.id)
-        self.height += 1
-        self.weight += block.difficulty
-        # if self.height % self.difficulty_readjustment_period == 0:
-        #     self.readjust_difficulty()
+        log("BLOCKCHAIN {} ACCEPT {}", self, block)
+        block.height = self.tip.height + 1
+        block.chain_weight = self.tip.chain_weight + block.weight
+        self._readjust_difficulty(block)
+        self.tip = block
+        self._count_weight(block, 1)
+        self._know(block)
+        if self._blocks_by_height is not None:
+            self._blocks_by_height.append(block)
+        emit(BLOCK_ACCEPTED, self, block)
         return True
 
-    def readjust_difficulty(self):
+    def _readjust_difficulty(self, block: Block):
+        previous = block.previous
+        period = self.difficulty_readjustment_period
+        block.epoch_start_time = (block.time if (block.height % period == 1) else previous.epoch_start_time)
+        block.next_difficulty = previous.next_difficulty
+        if not (self.retarget and block.height % period == 0):
+            return
         #
         # By construction,
         # 
@@ -115,21 +267,22 @@ class Blockchain():
         #   observed block time                        target block time
         #
         # so new_difficulty = (target block time * old_difficulty) / (observed block time)
+        #
+        # The observed block time is the mean gap between the blocks of
+        # this epoch, i.e. its duration over (period - 1).
         # 
-        log("BLOCKCHAIN {} DIFF READJ AT BLOCK {}".format(self, self.height))
-        blocks = [self.blocks[block_id] for block_id in list(reversed(self.heights))[:self.difficulty_readjustment_period]]
-        block_gaps = [(blocks[index+1].time - block.time) for index, block in enumerate(blocks[:-1])]
-        observed_block_time = mean(block_gaps)
-        old_difficulty = self.difficulty
-        new_difficulty = (self.block_time * old_difficulty) / observed_block_time
-        difficulty_change_ratio = new_difficulty / old_difficulty
+        log("BLOCKCHAIN {} DIFF READJ AT BLOCK {}", self, block.height)
+        observed_block_time = (block.time - block.epoch_start_time) / (period - 1)
+        if observed_block_time > 0:
+            difficulty_change_ratio = self.block_time / observed_block_time
+        else:
+            difficulty_change_ratio = self.max_difficulty_change_factor
         if difficulty_change_ratio > self.max_difficulty_change_factor:
             difficulty_change_ratio = self.max_difficulty_change_factor
         elif difficulty_change_ratio < self.inverse_max_difficulty_change_factor:
             difficulty_change_ratio = self.inverse_max_difficulty_change_factor
-        self.difficulty = old_difficulty * difficulty_change_ratio
-        log("BLOCKCHAIN {} DIFF. ADJ. {} => {}".format(self, old_difficulty, self.difficulty))
-    
+        block.next_difficulty = previous.next_difficulty * difficulty_change_ratio
+        log("BLOCKCHAIN {} DIFF. ADJ. {} => {}", self, previous.next_difficulty, block.next_difficulty, level=LOG_INFO)
 
 class BlockchainTransmission(Transmission):
     
@@ -141,3 +294,16 @@ class BlockchainTransmission(Transmission):
                  speed: Optional[float] = 1.0):
         Transmission.__init__(self, id, source_agent, transmission_time, speed=speed)
         self.blockchain = blockchain
+
+class BlockTransmission(Transmission):
+    """Carries a single new block (which refers to its parent) rather
+    than a whole blockchain."""
+
+    def __init__(self, 
+                 id:str,  
+                 source_agent:Agent, 
+                 transmission_time:float,
+                 block:Block,
+                 speed: Optional[float] = 1.0):
+        Transmission.__init__(self, id, source_agent, transmission_time, speed=speed)
+        self.block = block
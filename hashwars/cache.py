@@ -0,0 +1,133 @@
+from os import environ, walk, makedirs, replace, remove, utime, scandir
+from os.path import join, dirname, exists, relpath
+from hashlib import sha256
+from json import dumps as json_dumps
+from pickle import dumps, loads, UnpicklingError
+from tempfile import NamedTemporaryFile
+
+# Caches are pruned to this many bytes after each sweep by default.
+DEFAULT_CACHE_SIZE = 1024 ** 3
+
+class ResultCache(object):
+    """An on-disk cache of simulation results.
+
+    Each result is stored in its own file, named by a SHA-256 hash of
+    everything which determines it: the simulator, distance, hashrate
+    ratio, argv, seed, and replica of the run as well as the source
+    code of the `hashwars` package and of the simulator's namespace.
+    Changing any of these misses the cache.  Entries are written
+    atomically, and one which can't be read (e.g. truncated by a full
+    disk) is deleted and counted as a miss.
+
+    Results are evicted least recently used first once the cache is
+    larger than `max_size` bytes (see `prune`).
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, namespace, name, distance, hashrate_ratio, argv, seed, replica):
+        return sha256(json_dumps([
+            source_hash(namespace),
+            name,
+            float(distance),
+            float(hashrate_ratio),
+            list(argv),
+            seed,
+            int(replica),
+        ]).encode()).hexdigest()
+
+    def path(self, key):
+        return join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Returns (True, result) for a cached result or (False, None)."""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as input_file:
+                result = loads(input_file.read())
+        except FileNotFoundError:
+            self.misses += 1
+            return (False, None)
+        except (EOFError, UnpicklingError, ValueError, AttributeError, ImportError, IndexError):
+            # Another process may have removed it first.
+            try:
+                remove(path)
+            except FileNotFoundError:
+                pass
+            self.misses += 1
+            return (False, None)
+        # Mark the result as recently used.
+        utime(path)
+        self.hits += 1
+        return (True, result)
+
+    def put(self, key, result):
+        path = self.path(key)
+        makedirs(dirname(path), exist_ok=True)
+        # Written to a temporary file first so readers never see a
+        # partial result.
+        with NamedTemporaryFile(dir=dirname(path), delete=False) as output_file:
+            output_file.write(dumps(result))
+        replace(output_file.name, path)
+
+    def entries(self):
+        """Returns (path, size, last_used) for each cached result."""
+        entries = []
+        if not exists(self.directory):
+            return entries
+        for subdirectory in scandir(self.directory):
+            if not subdirectory.is_dir(): continue
+            for entry in scandir(subdirectory.path):
+                if entry.name.startswith('tmp'): continue
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def size(self):
+        return sum(size for path, size, last_used in self.entries())
+
+    def prune(self, max_size=None):
+        """Evicts least recently used results until the cache is at most
+        `max_size` (or the cache's own maximum) bytes.
+
+        Returns the number of results evicted.
+        """
+        max_size = (self.max_size if max_size is None else max_size)
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        size = sum(entry[1] for entry in entries)
+        evicted = 0
+        for path, entry_size, last_used in entries:
+            if size <= max_size: break
+            remove(path)
+            size -= entry_size
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        return self.prune(0)
+
+def default_cache_directory():
+    return environ.get('HASHWARS_CACHE_DIR')
+
+_SOURCE_HASHES = {}
+
+def source_hash(namespace):
+    """Hashes the source code of `hashwars` and of `namespace`'s
+    directory (e.g. `simulations`)."""
+    directories = (dirname(__file__), dirname(namespace.__file__))
+    if directories not in _SOURCE_HASHES:
+        digest = sha256()
+        for directory in directories:
+            for root, subdirectories, filenames in sorted(walk(directory)):
+                for filename in sorted(filenames):
+                    if not filename.endswith('.py'): continue
+                    path = join(root, filename)
+                    digest.update(relpath(path, directory).encode())
+                    with open(path, 'rb') as source_file:
+                        digest.update(source_file.read())
+        _SOURCE_HASHES[directories] = digest.hexdigest()
+    return _SOURCE_HASHES[directories]
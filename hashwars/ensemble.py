@@ -0,0 +1,128 @@
+from numpy import array, arange, zeros, full, inf, argmin, column_stack
+from numpy.random import default_rng
+
+MINORITY = 0
+MAJORITY = 1
+
+def launch_ensemble(distance, hashrate_ratio, replicas, max_time, mode='miner', difficulty=600.0, premium=1.0, generator=None):
+    """Simulates many independent replicas of a two-miner launch at once.
+
+    This is the same scenario as the `blockchain_launch` and
+    `miner_launch` simulations -- a minority miner at the origin with
+    unit hashrate and a majority miner at `distance` with
+    `hashrate_ratio` times that, exchanging their blockchains at the
+    speed of light -- but with every replica's state held in NumPy
+    arrays:
+
+    * `weights[replica, miner, producer]` is the weight in `miner`'s
+      blockchain mined by `producer` (the genesis block, common to
+      every chain, is left out)
+    * `next_blocks[replica, miner]` is when `miner` next finds a block
+    * each miner's transmissions in flight are a FIFO queue (they all
+      take `distance` to arrive) of arrival times and the weights of
+      the blockchain transmitted (see `_TransmissionQueues`)
+
+    Each pass of the loop processes the next event of every replica
+    which has not yet reached `max_time`.
+
+    Returns the final `weights` array.
+    """
+    generator = (generator if generator is not None else default_rng())
+    rows = arange(replicas)
+    block_weights = array([difficulty, difficulty * premium])
+    mean_block_times = block_weights / array([1.0, hashrate_ratio])
+
+    weights = zeros((replicas, 2, 2))
+    next_blocks = generator.standard_exponential((replicas, 2)) * mean_block_times
+    if mode == 'blockchain':
+        # The majority starts mining once it hears of the genesis block.
+        next_blocks[:, MAJORITY] += distance
+
+    queues = _TransmissionQueues(replicas)
+
+    while True:
+        # Events are: minority mines, majority mines, minority
+        # receives from majority, majority receives from minority.
+        times = column_stack((
+            next_blocks[:, MINORITY],
+            next_blocks[:, MAJORITY],
+            queues.next_times(MAJORITY),
+            queues.next_times(MINORITY),
+        ))
+        events = argmin(times, axis=1)
+        event_times = times[rows, events]
+        running = (event_times <= max_time)
+        if not running.any():
+            break
+
+        for miner in (MINORITY, MAJORITY):
+            other = 1 - miner
+
+            mined = rows[running & (events == miner)]
+            if len(mined):
+                weights[mined, miner, miner] += block_weights[miner]
+                queues.push(miner, mined, event_times[mined] + distance, weights[mined, miner])
+                next_blocks[mined, miner] = event_times[mined] + (generator.standard_exponential(len(mined)) * mean_block_times[miner])
+
+            received = rows[running & (events == (2 + miner))]
+            if len(received):
+                transmitted_weights = queues.pop(other, received)
+                # Heavier (or equally heavy) blockchains are accepted.
+                accepted = (transmitted_weights.sum(axis=1) >= weights[received, miner].sum(axis=1))
+                weights[received[accepted], miner] = transmitted_weights[accepted]
+
+    return weights
+
+class _TransmissionQueues(object):
+    """Each miner's transmissions in flight in every replica.
+
+    Queues are ring buffers: `heads` and `tails` count the
+    transmissions received and sent, and each is stored at its count
+    modulo `capacity`.  Received slots are emptied (their times reset
+    to infinity), and capacity only doubles once some queue is full,
+    so it stays bounded by the most transmissions ever in flight at
+    once rather than growing with the length of the run.
+    """
+
+    def __init__(self, replicas, capacity=16):
+        self.rows = arange(replicas)
+        self.times = full((2, replicas, capacity), inf)
+        self.weights = zeros((2, replicas, capacity, 2))
+        self.heads = zeros((2, replicas), dtype=int)
+        self.tails = zeros((2, replicas), dtype=int)
+
+    @property
+    def capacity(self):
+        return self.times.shape[2]
+
+    def next_times(self, miner):
+        return self.times[miner, self.rows, self.heads[miner] % self.capacity]
+
+    def push(self, miner, replicas, times, weights):
+        if (self.tails[miner, replicas] - self.heads[miner, replicas]).max() >= self.capacity:
+            self._grow()
+        slots = self.tails[miner, replicas] % self.capacity
+        self.times[miner, replicas, slots] = times
+        self.weights[miner, replicas, slots] = weights
+        self.tails[miner, replicas] += 1
+
+    def pop(self, miner, replicas):
+        slots = self.heads[miner, replicas] % self.capacity
+        weights = self.weights[miner, replicas, slots]
+        self.times[miner, replicas, slots] = inf
+        self.heads[miner, replicas] += 1
+        return weights
+
+    def _grow(self):
+        capacity = self.capacity
+        times = full(self.times.shape[:2] + (2 * capacity,), inf)
+        weights = zeros(self.weights.shape[:2] + (2 * capacity, 2))
+        # Every slot moves from its count modulo the old capacity to its
+        # count modulo the new one.
+        counts = self.heads[:, :, None] + arange(capacity)
+        queues = arange(2)[:, None, None]
+        rows = self.rows[None, :, None]
+        times[queues, rows, counts % (2 * capacity)] = self.times[queues, rows, counts % capacity]
+        weights[queues, rows, counts % (2 * capacity)] = self.weights[queues, rows, counts % capacity]
+        self.times = times
+        self.weights = weights
@@ -1,38 +1,56 @@
 from .agent import PoissonAgent
-from .blockchain import Block, BlockchainTransmission
-from .state import add_agent, log
+from .blockchain import Block, BlockchainTransmission, BlockTransmission
+from .state import log, log_enabled, transmit
+
+# Miners transmit either a copy of their whole blockchain or just
+# each block they mine.
+PROPAGATE_CHAIN = 'chain'
+PROPAGATE_BLOCK = 'block'
 
 class Miners(PoissonAgent):
     
-    def __init__(self, id, location,  blockchain, initial_hashrate=1.0, difficulty_premium=1.0, active=True):
-        PoissonAgent.__init__(self, id, location, active=active)
+    def __init__(self, id, location,  blockchain, initial_hashrate=1.0, difficulty_premium=1.0, active=True, sampler=None, propagation=PROPAGATE_CHAIN):
+        PoissonAgent.__init__(self, id, location, active=active, sampler=sampler)
+        assert propagation in (PROPAGATE_CHAIN, PROPAGATE_BLOCK)
         self.blockchain = blockchain
         self.hashrate = initial_hashrate
         self.difficulty_premium = difficulty_premium
+        self.propagation = propagation
 
     def log_advance(self, duration):
-        log("AGENT {} ADVANCE w/ {} BLOCKCHAIN {} {}".format(self.id, [transmission.id for transmission in self.transmissions_received.values()], self.blockchain.height, self.blockchain.weight))
+        if not log_enabled(): return
+        log("AGENT {} ADVANCE w/ {} BLOCKCHAIN {} {}", self.id, [transmission.id for transmission in self.transmissions_received.values()], self.blockchain.height, self.blockchain.weight)
 
     def mean_time_between_actions(self):
         return ((self.blockchain.difficulty * self.difficulty_premium) / self.hashrate)
 
     def act(self, time):
         block = Block(
-            id="{}:{}".format(self.id, Block.new_id()), 
+            id=Block.new_id(),
             previous=self.blockchain.tip,
             difficulty=(self.blockchain.difficulty * self.difficulty_premium),
             time=time,
+            producer=self.id,
         )
         if self.blockchain.add(block):
-            log("MINER {} MINED {}".format(self.id, block.id))
-            transmission = BlockchainTransmission(
-                "{} (transmission)".format(self.blockchain),
-                self,
-                time,
-                self.blockchain.copy())
-            add_agent(transmission)
+            log("MINER {} MINED {}", self.id, block.id)
+            if self.propagation == PROPAGATE_BLOCK:
+                transmission = BlockTransmission(
+                    "{} (transmission)".format(block.id),
+                    self,
+                    time,
+                    block)
+            else:
+                transmission = BlockchainTransmission(
+                    "{} (transmission)".format(self.blockchain),
+                    self,
+                    time,
+                    self.blockchain.copy())
+            transmit(transmission)
 
     def react(self, time,  transmission):
         if isinstance(transmission, (BlockchainTransmission,)):
             self.blockchain.merge(transmission.blockchain)
+        elif isinstance(transmission, (BlockTransmission,)):
+            self.blockchain.receive_block(transmission.block)
         PoissonAgent.react(self, time, transmission)
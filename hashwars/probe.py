@@ -0,0 +1,158 @@
+from bisect import bisect_right
+from math import floor, sqrt, nan
+
+from .state import subscribe, unsubscribe, BLOCK_ACCEPTED, CHAIN_REORGANIZED, TRANSMISSION_RECEIVED
+
+class TimeSeries(object):
+    """A value over time, recorded only when it changes.
+
+    With a `decimation` interval, at most one change is kept in each
+    interval (the last one), so long runs stay small.  Between
+    recorded times the value is the last one recorded.
+    """
+
+    def __init__(self, initial_value=0.0, start_time=0.0, decimation=None):
+        assert decimation is None or decimation > 0
+        self.decimation = decimation
+        self.times = [start_time]
+        self.values = [initial_value]
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def value(self):
+        return self.values[-1]
+
+    def record(self, time, value):
+        if value == self.values[-1]: return
+        if len(self.times) > 1 and self._bucket(time) == self._bucket(self.times[-1]):
+            self.times[-1] = time
+            self.values[-1] = value
+            # The change may have been undone within the interval.
+            if value == self.values[-2]:
+                self.times.pop()
+                self.values.pop()
+        else:
+            self.times.append(time)
+            self.values.append(value)
+
+    def _bucket(self, time):
+        return (floor(time / self.decimation) if self.decimation is not None else time)
+
+    def value_at(self, time):
+        index = bisect_right(self.times, time) - 1
+        return (self.values[index] if index >= 0 else nan)
+
+    def sample(self, times):
+        return [self.value_at(time) for time in times]
+
+class Statistics(object):
+    """Running count, mean, variance, minimum, and maximum of values
+    added one at a time (without keeping them)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._sum_of_squares = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        # Welford's algorithm.
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._sum_of_squares += delta * (value - self.mean)
+        self.minimum = (value if self.minimum is None else min(self.minimum, value))
+        self.maximum = (value if self.maximum is None else max(self.maximum, value))
+
+    @property
+    def variance(self):
+        return (self._sum_of_squares / (self.count - 1) if self.count > 1 else 0.0)
+
+    @property
+    def standard_deviation(self):
+        return sqrt(self.variance)
+
+class Probe(object):
+    """Observes events of the current simulation.
+
+    Subclasses list the events they observe in `events` and handle
+    each in a method of the same name (with dashes as underscores).
+    """
+
+    events = ()
+
+    def __init__(self):
+        self.callbacks = [(event, getattr(self, event.replace('-', '_'))) for event in self.events]
+        for event, callback in self.callbacks:
+            subscribe(event, callback)
+
+    def detach(self):
+        for event, callback in self.callbacks:
+            unsubscribe(event, callback)
+        self.callbacks = []
+
+class WeightProbe(Probe):
+    """Records the weight `producer` contributed to `blockchain` each
+    time it changes."""
+
+    events = (BLOCK_ACCEPTED, CHAIN_REORGANIZED)
+
+    def __init__(self, blockchain, producer, start_time=0.0, decimation=None):
+        self.blockchain = blockchain
+        self.producer = producer
+        self.series = TimeSeries(blockchain.weight_produced_by(producer), start_time=start_time, decimation=decimation)
+        Probe.__init__(self)
+
+    def block_accepted(self, time, blockchain, block):
+        if blockchain is self.blockchain and block.producer == self.producer:
+            self.series.record(time, blockchain.weight_produced_by(self.producer))
+
+    def chain_reorganized(self, time, blockchain, old_tip, new_tip):
+        if blockchain is self.blockchain:
+            self.series.record(time, blockchain.weight_produced_by(self.producer))
+
+class ReorganizationProbe(Probe):
+    """Counts `blockchain`'s reorganizations and keeps statistics of
+    how many blocks each abandoned."""
+
+    events = (CHAIN_REORGANIZED,)
+
+    def __init__(self, blockchain):
+        self.blockchain = blockchain
+        self.depths = Statistics()
+        Probe.__init__(self)
+
+    def chain_reorganized(self, time, blockchain, old_tip, new_tip):
+        if blockchain is not self.blockchain: return
+        # Count the blocks of the old chain back to the common ancestor.
+        old_block, new_block = old_tip, new_tip
+        depth = 0
+        while old_block.height > new_block.height:
+            old_block = old_block.previous
+            depth += 1
+        while new_block.height > old_block.height:
+            new_block = new_block.previous
+        while old_block is not new_block:
+            old_block = old_block.previous
+            new_block = new_block.previous
+            depth += 1
+        if depth > 0:
+            self.depths.add(depth)
+
+class ReceptionProbe(Probe):
+    """Keeps statistics of how long transmissions took to reach each
+    agent (or only `agent`)."""
+
+    events = (TRANSMISSION_RECEIVED,)
+
+    def __init__(self, agent=None):
+        self.agent = agent
+        self.latencies = Statistics()
+        Probe.__init__(self)
+
+    def transmission_received(self, time, agent, transmission):
+        if self.agent is None or agent is self.agent:
+            self.latencies.add(time - transmission.transmission_time)
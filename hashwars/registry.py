@@ -0,0 +1,110 @@
+from bisect import bisect_left, bisect_right
+from numbers import Real
+
+class AgentRegistry(object):
+    """Agents in a simulation, indexed by id, location, and priority.
+
+    Agents in one-dimensional space (at real-valued locations) are kept
+    sorted so range queries take logarithmic time.  Agents in two- or
+    three-dimensional space (at vector locations) are scanned, since
+    every transmission reaches all of them anyway.
+
+    Agents with trajectories move, so they are kept apart from these
+    indices (which only hold agents that don't) and evaluated together
+    as `Trajectories`.
+    """
+
+    def __init__(self):
+        self.agents = {}
+        self.locations = []
+        self.located_ids = []
+        self.vector_locations = {}
+        self.moving = {}
+        self._trajectories = None
+        self.stepped_agents_by_priority = {}
+
+    def __len__(self):
+        return len(self.agents)
+
+    def __contains__(self, id):
+        return id in self.agents
+
+    def __getitem__(self, id):
+        return self.agents[id]
+
+    def get(self, id):
+        return self.agents.get(id)
+
+    def ids(self):
+        return self.agents.keys()
+
+    def add(self, agent):
+        if agent.id in self.agents:
+            self.remove(agent.id)
+        self.agents[agent.id] = agent
+        if agent.trajectory is not None:
+            self.moving[agent.id] = agent
+            self._trajectories = None
+        elif is_vector(agent.location):
+            self.vector_locations[agent.id] = tuple(agent.location)
+        else:
+            index = bisect_right(self.locations, agent.location)
+            self.locations.insert(index, agent.location)
+            self.located_ids.insert(index, agent.id)
+        if agent.stepped:
+            self.stepped_agents_by_priority.setdefault(agent.priority, {})[agent.id] = agent
+
+    def remove(self, id):
+        agent = self.agents.pop(id)
+        if agent.trajectory is not None:
+            del self.moving[id]
+            self._trajectories = None
+        elif is_vector(agent.location):
+            del self.vector_locations[id]
+        else:
+            start = bisect_left(self.locations, agent.location)
+            end = bisect_right(self.locations, agent.location)
+            index = start + self.located_ids[start:end].index(id)
+            del self.locations[index]
+            del self.located_ids[index]
+        if agent.stepped:
+            group = self.stepped_agents_by_priority[agent.priority]
+            del group[id]
+            if not group:
+                del self.stepped_agents_by_priority[agent.priority]
+        return agent
+
+    def located_in(self, a, b, sort=True):
+        """Agents which don't move in the closed interval [a, b] (or,
+        given vectors, the box with corners `a` and `b`), sorted by
+        location unless `sort` is false."""
+        if is_vector(a):
+            ids = [
+                id for id, location in self.vector_locations.items()
+                if all(low <= coordinate <= high for low, coordinate, high in zip(a, location, b))
+            ]
+            if sort:
+                ids.sort(key=self.vector_locations.get)
+            return [self.agents[id] for id in ids]
+        start = bisect_left(self.locations, a)
+        end = bisect_right(self.locations, b)
+        return [self.agents[id] for id in self.located_ids[start:end]]
+
+    def moving_agents(self):
+        """Returns moving agents and their `Trajectories` (built once
+        for each set of moving agents)."""
+        if self._trajectories is None:
+            from .trajectory import Trajectories
+            agents = list(self.moving.values())
+            self._trajectories = (agents, Trajectories(agent.trajectory for agent in agents))
+        return self._trajectories
+
+    def stepped_agents(self):
+        # Highest priority first.
+        agents = []
+        for priority in sorted(self.stepped_agents_by_priority, reverse=True):
+            agents.extend(self.stepped_agents_by_priority[priority].values())
+        return agents
+
+def is_vector(location):
+    return not isinstance(location, Real)
@@ -0,0 +1,157 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os.path import basename, splitext
+
+from .utils import notify, derive_seed, ExponentialSampler
+from .state import Simulation, seed_random, current_random, set_spatial_boundary, add_agent, run_until
+from .blockchain import Block, Blockchain
+from .miners import Miners, PROPAGATE_BLOCK
+from .registry import is_vector
+
+#
+# A scenario file lists one miner per line:
+#
+#   # ID      LOCATION (light seconds)    HASHRATE (relative)
+#   earth     0                           0.9
+#   mars      720                         0.1
+#
+# Locations in two- or three-dimensional space have one column per
+# coordinate (`ID X Y HASHRATE` or `ID X Y Z HASHRATE`).  Blank lines
+# and anything after a `#` are ignored.
+#
+
+_DEFAULT_DIFFICULTY = 600.0
+
+ScenarioMiner = namedtuple('ScenarioMiner', ('id', 'location', 'hashrate'))
+
+class Scenario(object):
+    """Miners at fixed locations (in light seconds) with relative
+    hashrates, all mining on one blockchain."""
+
+    def __init__(self, name, miners):
+        assert len(miners) > 0
+        assert len(set(miner.id for miner in miners)) == len(miners), "Miner IDs must be unique"
+        assert all(miner.hashrate > 0 for miner in miners)
+        assert len(set(_dimensions(miner.location) for miner in miners)) == 1, "Miners must all be in the same space"
+        self.name = name
+        self.miners = list(miners)
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def ids(self):
+        return [miner.id for miner in self.miners]
+
+    @property
+    def dimensions(self):
+        return _dimensions(self.miners[0].location)
+
+    def scaled(self, distance_scale):
+        """Returns this scenario with every location multiplied by
+        `distance_scale`."""
+        return Scenario(
+            "{} x{}".format(self.name, distance_scale),
+            [miner._replace(location=_scaled(miner.location, distance_scale)) for miner in self.miners])
+
+    def spatial_boundary(self, margin=1.0):
+        if self.dimensions == 1:
+            locations = [miner.location for miner in self.miners]
+            return (min(locations) - margin, max(locations) + margin)
+        axes = list(zip(*(miner.location for miner in self.miners)))
+        return (tuple(min(axis) - margin for axis in axes), tuple(max(axis) + margin for axis in axes))
+
+def _dimensions(location):
+    return (len(location) if is_vector(location) else 1)
+
+def _scaled(location, scale):
+    if is_vector(location):
+        return tuple(coordinate * scale for coordinate in location)
+    return location * scale
+
+def read_scenario(path):
+    miners = []
+    with open(path) as scenario_file:
+        for number, line in enumerate(scenario_file, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields: continue
+            if not (3 <= len(fields) <= 5):
+                raise ValueError("{}:{}: expected ID LOCATION HASHRATE".format(path, number))
+            coordinates = tuple(float(field) for field in fields[1:-1])
+            location = (coordinates[0] if len(coordinates) == 1 else coordinates)
+            miners.append(ScenarioMiner(fields[0], location, float(fields[-1])))
+    return Scenario(splitext(basename(path))[0], miners)
+
+def run_scenario(scenario, duration, difficulty=_DEFAULT_DIFFICULTY, propagation=PROPAGATE_BLOCK, seed=None):
+    """Runs `scenario` for `duration` seconds in a simulation of its own.
+
+    Hashrates are normalized so the miners together find a block every
+    `difficulty` seconds.  Each miner keeps its own view of the
+    blockchain; all of them start from the same genesis block.
+
+    Returns the fraction of the heaviest view's weight (after the
+    genesis block) mined by each miner, in the scenario's order.
+    """
+    with Simulation():
+        if seed is not None:
+            seed_random(seed)
+        set_spatial_boundary(*scenario.spatial_boundary())
+
+        total_hashrate = sum(miner.hashrate for miner in scenario.miners)
+        sampler = ExponentialSampler(generator=current_random())
+        genesis_block = Block("genesis", None, difficulty=difficulty, height=1, time=0.0)
+        miners = [
+            Miners(
+                miner.id,
+                miner.location,
+                Blockchain(miner.id, genesis_block, initial_difficulty=difficulty),
+                initial_hashrate=(miner.hashrate / total_hashrate),
+                sampler=sampler,
+                propagation=propagation)
+            for miner in scenario.miners
+        ]
+        for miner in miners:
+            add_agent(miner)
+        run_until(duration)
+
+        # The first of equally heavy views wins.
+        blockchain = max((miner.blockchain for miner in miners), key=lambda blockchain: blockchain.weight)
+        weight_mined = blockchain.weight - genesis_block.weight
+        return [
+            ((blockchain.weight_produced_by(miner.id) / weight_mined) if weight_mined > 0 else 0.0)
+            for miner in miners
+        ]
+
+def scenario_simulations(scenario, duration, count, distance_scales=(1.0,), difficulty=_DEFAULT_DIFFICULTY, propagation=PROPAGATE_BLOCK, seed=None):
+    """Runs `count` replicas of `scenario` with its locations scaled by
+    each of `distance_scales`, in parallel.
+
+    Returns `(ids, distance_scales, shares, seed)` where
+    `shares[scale_index, replica, miner_index]` is the share of the
+    weight each miner mined (see `run_scenario`).
+    """
+    from numpy import zeros
+    notify("SCENARIO: {} ({} miners)".format(scenario, len(scenario.miners)))
+    notify("DISTANCE SCALES: {}".format(list(distance_scales)))
+    notify("COUNT: {}".format(count))
+    notify("DURATION: {}".format(duration))
+
+    shares = zeros((len(distance_scales), count, len(scenario.miners)))
+    with ProcessPoolExecutor() as executor:
+        futures = [
+            executor.submit(_run_scenario_replica, scenario, duration, scale_index, distance_scale, replica, difficulty, propagation, seed)
+            for scale_index, distance_scale in enumerate(distance_scales)
+            for replica in range(count)
+        ]
+        for completed, future in enumerate(as_completed(futures), 1):
+            scale_index, replica, replica_shares = future.result()
+            shares[scale_index, replica] = replica_shares
+            notify("COMPLETED {}/{}".format(completed, len(futures)))
+    for distance_scale, scale_shares in zip(distance_scales, shares):
+        notify("SCALE {}: {}".format(distance_scale, " ".join(
+            "{}={:0.4f}".format(id, share) for id, share in zip(scenario.ids, scale_shares.mean(axis=0)))))
+    return (scenario.ids, list(distance_scales), shares, seed)
+
+def _run_scenario_replica(scenario, duration, scale_index, distance_scale, replica, difficulty, propagation, seed):
+    replica_seed = derive_seed(seed, distance_scale, replica)
+    return (scale_index, replica, run_scenario(scenario.scaled(distance_scale), duration, difficulty=difficulty, propagation=propagation, seed=replica_seed))
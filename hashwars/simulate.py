@@ -1,9 +1,31 @@
-from concurrent.futures import ProcessPoolExecutor
-from random import shuffle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib import import_module
+from math import ceil
+from os import cpu_count
+from random import Random
+from statistics import NormalDist
 
-from .utils import notify
+from .utils import notify, append_result, read_appended_results, derive_seed
+from .state import seed_random
 
-def single_static_binary_simulation(namespace, name, distance, hashrate_ratio, simulator_argv):
+# NumPy is imported by the functions which collate sweeps, so worker
+# processes and single simulations start without it.
+
+# Batches per worker process when no batch size is given.
+_BATCHES_PER_WORKER = 4
+
+# Defaults for sequential sweeps.
+_DEFAULT_CONFIDENCE = 0.95
+_DEFAULT_MIN_COUNT = 10
+_DEFAULT_MAX_COUNT = 1000
+
+# Replicated simulators are seeded once per this many replicas.
+_REPLICA_CHUNK = 256
+
+# Coarse grid spacing (in grid steps) for adaptive sweeps.
+_DEFAULT_STRIDE = 4
+
+def single_static_binary_simulation(namespace, name, distance, hashrate_ratio, simulator_argv, cache=None, seed=None):
     simulator = getattr(namespace, name)
     distance = float(distance)
     hashrate_ratio = float(hashrate_ratio)
@@ -11,35 +33,480 @@ def single_static_binary_simulation(namespace, name, distance, hashrate_ratio, s
     notify("DISTANCE: {}".format(distance))
     notify("HASHRATE RATIO: {}".format(hashrate_ratio))
     notify("ARGV: {}".format(simulator_argv))
-    return simulator((distance, hashrate_ratio, simulator_argv))
-    
-def many_static_binary_simulations(namespace, name, count, distances, hashrate_ratios, simulator_argv):
-    simulator = getattr(namespace, name)
+    notify("SEED: {}".format(seed))
+    cache = _seeded_cache(cache, seed)
+    if cache is not None:
+        key = cache.key(namespace, name, distance, hashrate_ratio, simulator_argv, seed, 0)
+        cached, result = cache.get(key)
+        if cached:
+            notify("CACHED: {}".format(cache.path(key)))
+            return result
+    result = _run_replicas(simulator, (distance, hashrate_ratio, simulator_argv), seed, 0, 1)[0]
+    if cache is not None:
+        cache.put(key, result)
+        cache.prune()
+    return result
+
+def replicated(simulator):
+    """Marks `simulator` as running many replicas in one call.
+
+    A replicated simulator is called as `simulator(params, replicas)`
+    and returns a list of `replicas` results.  Sweeps run it on fixed
+    chunks of replicas, each with its own random stream, so a seed
+    determines its results however the sweep batches them.
+    """
+    simulator.replicated = True
+    return simulator
+
+def many_static_binary_simulations(namespace, name, count, distances, hashrate_ratios, simulator_argv, checkpoint_path=None, batch_size=None, cache=None, seed=None):
     notify("SIMULATION: {}".format(name))
     notify("DISTANCES: {} - {} ({} total)".format(distances[0], distances[-1], len(distances)))
     notify("HASHRATE RATIOS: {} - {} ({} total)".format(hashrate_ratios[0], hashrate_ratios[-1], len(hashrate_ratios)))
     notify("COUNT: {}".format(count))
     notify("ARGV: {}".format(simulator_argv))
 
-    runs = []
-    for distance in distances:
-        for hashrate_ratio in hashrate_ratios:
-            for run in range(count):
-                runs.append((distance, hashrate_ratio, simulator_argv))
-
-    notify("TOTAL RUNS: {}".format(len(runs)))
-    notify("Randomizing runs...")
-    shuffle(runs)
-    notify("Starting simulations...")
-    with ProcessPoolExecutor() as executor:
-        results_list = list(executor.map(simulator, runs))
-        notify("Obtained results...")
-        results_matrix = []
-        for distance in distances:
-            results_row_at_distance = []
-            results_at_distance_list = [result for result in results_list if result[0] == distance]
-            for hashrate_ratio in hashrate_ratios:
-                results_row_at_distance.append([result[2] for result in results_at_distance_list if result[1] == hashrate_ratio])
-            results_matrix.append(results_row_at_distance)
-        notify("Collated results")
-        return (distances, hashrate_ratios, results_matrix)
+    grid = _Grid(distances, hashrate_ratios, count)
+    with _Sweep(namespace, name, simulator_argv, grid, checkpoint_path, batch_size, cache, seed) as sweep:
+        sweep.run([
+            (distance_index, hashrate_ratio_index)
+            for distance_index in range(len(distances))
+            for hashrate_ratio_index in range(len(hashrate_ratios))
+        ])
+    notify("Collated results")
+    return (distances, hashrate_ratios, grid.results, seed)
+
+def adaptive_static_binary_simulations(namespace, name, count, distances, hashrate_ratios, simulator_argv, budget, stride=_DEFAULT_STRIDE, interpolate=True, checkpoint_path=None, batch_size=None, cache=None, seed=None):
+    """Runs simulations on an adaptively refined subset of a grid.
+
+    Runs `count` simulations at every `stride`-th distance and
+    hashrate ratio first.  Cells of this coarse grid are then split in
+    half along each axis, sampling the new corners, in order of how
+    much their results vary: the spread of mean results across a
+    cell's corners plus the largest standard deviation at any of them.
+    Refinement stops once no cell varies, no cell can be split, or
+    splitting the next cell would take more than `budget` runs in
+    total.
+
+    Results at points which were not sampled are interpolated from the
+    corners of the smallest cell containing them -- bilinearly in mean
+    and standard deviation, with runs blended from the corners' -- or
+    are NaN if `interpolate` is false.
+    """
+    notify("SIMULATION: {}".format(name))
+    notify("DISTANCES: {} - {} ({} total)".format(distances[0], distances[-1], len(distances)))
+    notify("HASHRATE RATIOS: {} - {} ({} total)".format(hashrate_ratios[0], hashrate_ratios[-1], len(hashrate_ratios)))
+    notify("COUNT: {}".format(count))
+    notify("BUDGET: {} runs (stride {})".format(budget, stride))
+    notify("ARGV: {}".format(simulator_argv))
+
+    grid = _Grid(distances, hashrate_ratios, count)
+    distance_indices = _coarse_indices(len(distances), stride)
+    hashrate_ratio_indices = _coarse_indices(len(hashrate_ratios), stride)
+    # Each cell is (first_distance_index, last_distance_index,
+    # first_hashrate_ratio_index, last_hashrate_ratio_index).
+    cells = [
+        (distance_index, next_distance_index, hashrate_ratio_index, next_hashrate_ratio_index)
+        for distance_index, next_distance_index in _spans(distance_indices)
+        for hashrate_ratio_index, next_hashrate_ratio_index in _spans(hashrate_ratio_indices)
+    ]
+
+    with _Sweep(namespace, name, simulator_argv, grid, checkpoint_path, batch_size, cache, seed) as sweep:
+        sweep.run(_corners(cells))
+        if grid.total_runs() > budget:
+            notify("WARNING: Coarse grid alone took {} runs".format(grid.total_runs()))
+        while True:
+            runs = grid.total_runs()
+            splittable_cells = [cell for cell in cells if _splittable(cell)]
+            splittable_cells.sort(key=grid.variation, reverse=True)
+            split_cells = set()
+            new_points = set()
+            for cell in splittable_cells:
+                if grid.variation(cell) <= 0: break
+                cell_points = set(point for point in _corners(_split(cell)) if not grid.sampled(point)) - new_points
+                if runs + (count * len(cell_points)) > budget: break
+                runs += count * len(cell_points)
+                new_points |= cell_points
+                split_cells.add(cell)
+            if not split_cells:
+                break
+            notify("REFINING: {} cells ({} new points)".format(len(split_cells), len(new_points)))
+            cells = [child for cell in cells for child in (_split(cell) if cell in split_cells else [cell])]
+            sweep.run(sorted(new_points))
+
+    notify("SAMPLED: {} of {} points ({} runs)".format(int((grid.counts > 0).sum()), grid.counts.size, grid.total_runs()))
+    if interpolate:
+        for cell in cells:
+            grid.interpolate(cell)
+        notify("Interpolated results")
+    return (distances, hashrate_ratios, grid.results, seed)
+
+def sequential_static_binary_simulations(namespace, name, distances, hashrate_ratios, simulator_argv, ci_width=None, relative_error=None, confidence=_DEFAULT_CONFIDENCE, min_count=_DEFAULT_MIN_COUNT, max_count=_DEFAULT_MAX_COUNT, checkpoint_path=None, batch_size=None, cache=None, seed=None):
+    """Runs simulations at each point until its mean is known well enough.
+
+    Every point gets `min_count` runs.  After each round, a point has
+    converged once the `confidence` interval of its mean result is at
+    most `ci_width` wide or its half-width is at most `relative_error`
+    times the mean (whichever are given).  Points which have not
+    converged get another round of runs -- as many as their variance
+    so far suggests they need, but at most doubling their runs and
+    never more than `max_count` in total.  Points need at least two
+    runs to converge.
+
+    Returns (distances, hashrate_ratios, results, counts, seed), where
+    `counts[distance_index, hashrate_ratio_index]` is the number of
+    runs at each point and unused entries of `results` are NaN.
+    """
+    assert ci_width is not None or relative_error is not None, "Give a confidence interval width or a relative error"
+    from numpy import full, zeros, nanmean, nanstd, nan_to_num, ceil as ceil_array, clip, minimum, maximum, errstate
+    notify("SIMULATION: {}".format(name))
+    notify("DISTANCES: {} - {} ({} total)".format(distances[0], distances[-1], len(distances)))
+    notify("HASHRATE RATIOS: {} - {} ({} total)".format(hashrate_ratios[0], hashrate_ratios[-1], len(hashrate_ratios)))
+    notify("COUNT: {} - {}".format(min_count, max_count))
+    notify("TARGET: {:.0%} CONFIDENCE INTERVAL WIDTH {} RELATIVE ERROR {}".format(confidence, ci_width, relative_error))
+    notify("ARGV: {}".format(simulator_argv))
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    grid = _Grid(distances, hashrate_ratios, max_count)
+    targets = full(grid.counts.shape, min_count)
+    indices = [
+        (distance_index, hashrate_ratio_index)
+        for distance_index in range(len(distances))
+        for hashrate_ratio_index in range(len(hashrate_ratios))
+    ]
+    with _Sweep(namespace, name, simulator_argv, grid, checkpoint_path, batch_size, cache, seed) as sweep:
+        while indices:
+            sweep.run(indices, targets)
+            counts = grid.counts
+            with errstate(invalid='ignore', divide='ignore'):
+                means = nanmean(grid.results, axis=2)
+                deviations = nan_to_num(nanstd(grid.results, axis=2, ddof=1))
+                # Largest acceptable half-width of each confidence interval.
+                half_widths = zeros(counts.shape)
+                if ci_width is not None:
+                    half_widths = maximum(half_widths, ci_width / 2)
+                if relative_error is not None:
+                    half_widths = maximum(half_widths, relative_error * abs(means))
+                needed_counts = (z * deviations / half_widths) ** 2
+            converged = (counts >= max_count) | ((counts >= 2) & ((deviations == 0) | (needed_counts <= counts)))
+            needed_counts = ceil_array(nan_to_num(needed_counts, nan=max_count, posinf=max_count))
+            targets = minimum(clip(needed_counts, counts + 1, 2 * counts), max_count).astype(int)
+            indices = [index for index in indices if not converged[index]]
+            notify("CONVERGED: {} of {} points ({} runs)".format(int(converged.sum()), converged.size, grid.total_runs()))
+
+    notify("Collated results")
+    counts = grid.counts.copy()
+    return (distances, hashrate_ratios, grid.results[:, :, :max(1, int(counts.max()))], counts, seed)
+
+class _Grid(object):
+    """Results of runs at each point of a grid of distances and hashrate ratios.
+
+    `results[distance_index, hashrate_ratio_index]` holds `count`
+    results (NaN for runs not yet completed).
+    """
+
+    def __init__(self, distances, hashrate_ratios, count):
+        from numpy import asarray, full, zeros, nan
+        self.distances = asarray(distances, dtype=float)
+        self.hashrate_ratios = asarray(hashrate_ratios, dtype=float)
+        self.count = count
+        # Results of each run go straight into their replica's place in
+        # the grid.
+        self.results = full((len(distances), len(hashrate_ratios), count), nan)
+        self.completed = zeros(self.results.shape, dtype=bool)
+        self.counts = zeros((len(distances), len(hashrate_ratios)), dtype=int)
+        self.distance_indices = {distance:index for index, distance in enumerate(distances)}
+        self.hashrate_ratio_indices = {hashrate_ratio:index for index, hashrate_ratio in enumerate(hashrate_ratios)}
+
+    # Results of replicas beyond the grid's count, or already collated,
+    # are ignored.
+    def collate(self, distance_index, hashrate_ratio_index, result, replica):
+        if replica < self.count and not self.completed[distance_index, hashrate_ratio_index, replica]:
+            self.results[distance_index, hashrate_ratio_index, replica] = result[2]
+            self.completed[distance_index, hashrate_ratio_index, replica] = True
+            self.counts[distance_index, hashrate_ratio_index] += 1
+
+    def collate_at(self, distance, hashrate_ratio, result, replica):
+        if distance in self.distance_indices and hashrate_ratio in self.hashrate_ratio_indices:
+            self.collate(self.distance_indices[distance], self.hashrate_ratio_indices[hashrate_ratio], result, replica)
+
+    def missing_replicas(self, point, target):
+        return [replica for replica in range(min(target, self.count)) if not self.completed[point][replica]]
+
+    def sampled(self, point):
+        return self.counts[point] > 0
+
+    def total_runs(self):
+        return int(self.counts.sum())
+
+    def variation(self, cell):
+        from numpy import nanmean, nanstd
+        distance_index, next_distance_index, hashrate_ratio_index, next_hashrate_ratio_index = cell
+        corner_results = self.results[[distance_index, next_distance_index]][:, [hashrate_ratio_index, next_hashrate_ratio_index]]
+        means = nanmean(corner_results, axis=2)
+        return float((means.max() - means.min()) + nanstd(corner_results, axis=2).max())
+
+    # Runs of a cell's corners are independent, so blending them run by
+    # run would average away their spread (halving it at the cell's
+    # center).  Means and standard deviations are interpolated
+    # separately instead, and each unsampled point's blended runs are
+    # rescaled to have exactly those.
+    def interpolate(self, cell):
+        from numpy import nanmean, nanstd, divide, zeros_like
+        distance_index, next_distance_index, hashrate_ratio_index, next_hashrate_ratio_index = cell
+        distance_fractions = _fractions(self.distances[distance_index:next_distance_index + 1])[:, None, None]
+        hashrate_ratio_fractions = _fractions(self.hashrate_ratios[hashrate_ratio_index:next_hashrate_ratio_index + 1])[None, :, None]
+        corners = [
+            ((1 - distance_fractions) * (1 - hashrate_ratio_fractions), self.results[distance_index, hashrate_ratio_index]),
+            (distance_fractions * (1 - hashrate_ratio_fractions), self.results[next_distance_index, hashrate_ratio_index]),
+            ((1 - distance_fractions) * hashrate_ratio_fractions, self.results[distance_index, next_hashrate_ratio_index]),
+            (distance_fractions * hashrate_ratio_fractions, self.results[next_distance_index, next_hashrate_ratio_index]),
+        ]
+        runs = sum(weight * corner[None, None, :] for weight, corner in corners)
+        means = sum(weight * nanmean(corner) for weight, corner in corners)
+        deviations = sum(weight * nanstd(corner) for weight, corner in corners)
+        run_deviations = nanstd(runs, axis=2, keepdims=True)
+        standardized_runs = divide(runs - nanmean(runs, axis=2, keepdims=True), run_deviations, out=zeros_like(runs), where=(run_deviations > 0))
+        interpolated = means + (deviations * standardized_runs)
+        results = self.results[distance_index:next_distance_index + 1, hashrate_ratio_index:next_hashrate_ratio_index + 1]
+        unsampled = (self.counts[distance_index:next_distance_index + 1, hashrate_ratio_index:next_hashrate_ratio_index + 1] == 0)
+        results[unsampled] = interpolated[unsampled]
+
+class _Sweep(object):
+    """Runs simulations at points of a `_Grid` on a pool of workers.
+
+    Each completed run is recorded in the checkpoint (if any) as
+    (distance, hashrate_ratio, replica, result), where its replica is
+    the index of the run at its point, after a header naming the
+    simulator, its arguments, and the seed; a checkpoint of any other
+    sweep is refused.  Runs are looked up in (and added to) the cache
+    (if any, and only when seeded) by their replica.  Each replica's random stream is seeded from `seed`,
+    its point, and its replica (see `derive_seed`).
+    """
+
+    def __init__(self, namespace, name, simulator_argv, grid, checkpoint_path=None, batch_size=None, cache=None, seed=None):
+        self.namespace = namespace
+        self.name = name
+        self.simulator_argv = simulator_argv
+        self.grid = grid
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.cache = _seeded_cache(cache, seed)
+        self.seed = seed
+        self.checkpoint_file = None
+        self.executor = None
+
+    def __enter__(self):
+        if self.checkpoint_path is not None:
+            header = self.checkpoint_header()
+            records = read_appended_results(self.checkpoint_path)
+            if records and records[0] != header:
+                raise ValueError("Checkpoint {} is of another sweep ({})".format(self.checkpoint_path, records[0]))
+            completed_runs = records[1:]
+            notify("CHECKPOINT: {} ({} runs completed)".format(self.checkpoint_path, len(completed_runs)))
+            for distance, hashrate_ratio, replica, result in completed_runs:
+                self.grid.collate_at(distance, hashrate_ratio, result, replica)
+            self.checkpoint_file = open(self.checkpoint_path, 'ab')
+            if not records:
+                append_result(header, self.checkpoint_file)
+        self.executor = ProcessPoolExecutor(initializer=_initialize_worker, initargs=(self.namespace.__name__, self.name, self.simulator_argv, self.seed))
+        return self
+
+    def checkpoint_header(self):
+        return {
+            'simulator': "{}.{}".format(self.namespace.__name__, self.name),
+            'argv': list(self.simulator_argv),
+            'seed': self.seed,
+        }
+
+    def __exit__(self, *exception):
+        self.executor.shutdown()
+        if self.checkpoint_file is not None:
+            self.checkpoint_file.close()
+        if self.cache is not None:
+            notify("CACHE: {} hits, {} misses, {} results evicted".format(self.cache.hits, self.cache.misses, self.cache.prune()))
+
+    # Runs whichever of the first `targets` replicas (or the grid's
+    # count) are missing at each (distance_index, hashrate_ratio_index)
+    # point.
+    def run(self, indices, targets=None):
+        grid = self.grid
+        # Each point is (distance_index, hashrate_ratio_index, distance,
+        # hashrate_ratio, first_replica, replicas).
+        points = []
+        for distance_index, hashrate_ratio_index in indices:
+            distance = grid.distances[distance_index]
+            hashrate_ratio = grid.hashrate_ratios[hashrate_ratio_index]
+            target = (grid.count if targets is None else targets[distance_index, hashrate_ratio_index])
+            # Replicas missing from the grid (and the cache) are run in
+            # contiguous spans.
+            for replica in grid.missing_replicas((distance_index, hashrate_ratio_index), target):
+                if self.cache is not None:
+                    cached, result = self.cache.get(self.cache_key(distance, hashrate_ratio, replica))
+                    if cached:
+                        self.collate(distance_index, hashrate_ratio_index, result, replica)
+                        continue
+                if points and points[-1][:2] == (distance_index, hashrate_ratio_index) and sum(points[-1][-2:]) == replica:
+                    points[-1] = points[-1][:-1] + (points[-1][-1] + 1,)
+                else:
+                    points.append((distance_index, hashrate_ratio_index, distance, hashrate_ratio, replica, 1))
+        total_runs = sum(point[-1] for point in points)
+        if total_runs == 0:
+            return
+
+        notify("TOTAL RUNS: {}".format(total_runs))
+        notify("Randomizing runs...")
+        Random(self.seed).shuffle(points)
+        batch_size = self.batch_size
+        if batch_size is None:
+            batch_size = max(1, ceil(total_runs / (_BATCHES_PER_WORKER * (cpu_count() or 1))))
+        batches = _batches(points, batch_size)
+        notify("BATCHES: {} (of {} runs)".format(len(batches), batch_size))
+        notify("Starting simulations...")
+        futures = [self.executor.submit(_run_batch, batch) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                for distance_index, hashrate_ratio_index, first_replica, point_results in future.result():
+                    for replica, result in enumerate(point_results, first_replica):
+                        self.collate(distance_index, hashrate_ratio_index, result, replica)
+                        if self.cache is not None:
+                            self.cache.put(self.cache_key(grid.distances[distance_index], grid.hashrate_ratios[hashrate_ratio_index], replica), result)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def collate(self, distance_index, hashrate_ratio_index, result, replica):
+        self.grid.collate(distance_index, hashrate_ratio_index, result, replica)
+        if self.checkpoint_file is not None:
+            append_result((float(self.grid.distances[distance_index]), float(self.grid.hashrate_ratios[hashrate_ratio_index]), replica, result), self.checkpoint_file)
+
+    def cache_key(self, distance, hashrate_ratio, replica):
+        return self.cache.key(self.namespace, self.name, distance, hashrate_ratio, self.simulator_argv, self.seed, replica)
+
+# Unseeded runs draw fresh random streams, so replaying cached ones
+# would repeat results which should be independent.
+def _seeded_cache(cache, seed):
+    if cache is not None and seed is None:
+        notify("CACHE: not used without a seed")
+        return None
+    return cache
+
+# 10, 4 => [0, 4, 8, 9]
+def _coarse_indices(length, stride):
+    indices = list(range(0, length, stride))
+    if indices[-1] != length - 1:
+        indices.append(length - 1)
+    return indices
+
+# [0, 4, 8] => [(0, 4), (4, 8)] and [0] => [(0, 0)]
+def _spans(indices):
+    if len(indices) == 1:
+        return [(indices[0], indices[0])]
+    return list(zip(indices[:-1], indices[1:]))
+
+def _splittable(cell):
+    distance_index, next_distance_index, hashrate_ratio_index, next_hashrate_ratio_index = cell
+    return (next_distance_index - distance_index > 1) or (next_hashrate_ratio_index - hashrate_ratio_index > 1)
+
+# Halves a cell along each axis which is more than one step wide.
+def _split(cell):
+    distance_index, next_distance_index, hashrate_ratio_index, next_hashrate_ratio_index = cell
+    distance_spans = _halves(distance_index, next_distance_index)
+    hashrate_ratio_spans = _halves(hashrate_ratio_index, next_hashrate_ratio_index)
+    return [span + other_span for span in distance_spans for other_span in hashrate_ratio_spans]
+
+def _halves(index, next_index):
+    if next_index - index > 1:
+        middle_index = (index + next_index) // 2
+        return [(index, middle_index), (middle_index, next_index)]
+    return [(index, next_index)]
+
+def _corners(cells):
+    points = set()
+    for distance_index, next_distance_index, hashrate_ratio_index, next_hashrate_ratio_index in cells:
+        for point_distance_index in (distance_index, next_distance_index):
+            for point_hashrate_ratio_index in (hashrate_ratio_index, next_hashrate_ratio_index):
+                points.add((point_distance_index, point_hashrate_ratio_index))
+    return sorted(points)
+
+# [2, 3, 6] => [0, 0.25, 1]
+def _fractions(values):
+    from numpy import zeros
+    if len(values) == 1 or values[-1] == values[0]:
+        return zeros(len(values))
+    return (values - values[0]) / (values[-1] - values[0])
+
+# Splits points into batches of about `batch_size` runs, keeping the
+# replicas of a point together where possible.
+def _batches(points, batch_size):
+    batches = []
+    batch = []
+    batch_runs = 0
+    for distance_index, hashrate_ratio_index, distance, hashrate_ratio, first_replica, replicas in points:
+        while replicas > 0:
+            runs = min(replicas, batch_size - batch_runs)
+            batch.append((distance_index, hashrate_ratio_index, distance, hashrate_ratio, first_replica, runs))
+            batch_runs += runs
+            first_replica += runs
+            replicas -= runs
+            if batch_runs == batch_size:
+                batches.append(batch)
+                batch = []
+                batch_runs = 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+#
+# Worker processes look up the simulator and its arguments once, in
+# their initializer, and then run whole batches of replicas.
+#
+
+_WORKER = {}
+
+def _initialize_worker(namespace_name, name, simulator_argv, seed):
+    _WORKER['simulator'] = getattr(import_module(namespace_name), name)
+    _WORKER['argv'] = simulator_argv
+    _WORKER['seed'] = seed
+
+def _run_batch(batch):
+    simulator = _WORKER['simulator']
+    simulator_argv = _WORKER['argv']
+    seed = _WORKER['seed']
+    return [
+        (distance_index, hashrate_ratio_index, first_replica, _run_replicas(simulator, (distance, hashrate_ratio, simulator_argv), seed, first_replica, replicas))
+        for distance_index, hashrate_ratio_index, distance, hashrate_ratio, first_replica, replicas in batch
+    ]
+
+# Seeds the current simulation's random stream for each replica (or
+# for each chunk of `_REPLICA_CHUNK` replicas of a replicated
+# simulator, running whole chunks and keeping the replicas asked for).
+def _run_replicas(simulator, params, seed, first_replica, replicas):
+    distance, hashrate_ratio, simulator_argv = params
+    results = []
+    if getattr(simulator, 'replicated', False):
+        end = first_replica + replicas
+        chunk_start = first_replica - (first_replica % _REPLICA_CHUNK)
+        while chunk_start < end:
+            seed_random(derive_seed(seed, distance, hashrate_ratio, chunk_start, _REPLICA_CHUNK))
+            chunk = simulator(params, _REPLICA_CHUNK)
+            results.extend(chunk[max(first_replica - chunk_start, 0):end - chunk_start])
+            chunk_start += _REPLICA_CHUNK
+        return results
+    for replica in range(first_replica, first_replica + replicas):
+        seed_random(derive_seed(seed, distance, hashrate_ratio, replica))
+        results.append(simulator(params))
+    return results
+
+_PARSED_ARGV = {}
+
+def parse_simulator_argv(parser, argv):
+    """Parses `argv` with `parser`, once per process.
+
+    Simulators are called with the same arguments for every run of a
+    sweep, so their parsed values are cached.
+    """
+    key = (id(parser), tuple(argv))
+    if key not in _PARSED_ARGV:
+        _PARSED_ARGV[key] = parser.parse_args(argv)
+    return _PARSED_ARGV[key]
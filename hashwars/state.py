@@ -1,91 +1,453 @@
+from atexit import register as at_exit
 from os import environ
 from sys import stderr
+from heapq import heappush, heappop
+from itertools import count
+from collections import deque
+from threading import local, Lock
+from random import Random
 
 from .utils import Duration
+from .registry import AgentRegistry, is_vector
 
-_TIME = 0.0
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARNING = 30
+LOG_ERROR = 40
 
-_SPACE = [0, 1]
+_LOG_LEVEL_NAMES = {
+    'DEBUG': LOG_DEBUG,
+    'INFO': LOG_INFO,
+    'WARNING': LOG_WARNING,
+    'ERROR': LOG_ERROR,
+}
 
-_AGENTS = {}
+# Events observers can subscribe to, and the arguments they're called
+# with (after the time of the event):
+#
+#   BLOCK_ACCEPTED          blockchain, block (added to its tip)
+#   CHAIN_REORGANIZED       blockchain, old_tip, new_tip (adopted from
+#                           another blockchain or received blocks)
+#   TRANSMISSION_RECEIVED   agent, transmission
+#
+BLOCK_ACCEPTED = 'block-accepted'
+CHAIN_REORGANIZED = 'chain-reorganized'
+TRANSMISSION_RECEIVED = 'transmission-received'
 
-_LOG = []
+# Log configuration given to each new simulation.
+_LOG_DEFAULTS = {
+    'level': LOG_WARNING,
+    'buffer_size': 10000,
+    'stream': None,
+}
 
-_LOG_ID = None
+class Simulation(object):
+    """The clock, space, agents, events, and log of one simulation.
 
-def log(string):
-    _LOG.append((_TIME, string))
+    The module-level functions (`current_time`, `add_agent`, &c.)
+    operate on the current simulation of the calling thread, which is
+    a shared default unless another simulation has been entered with
+    `with`.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        # Bounds of space: (least, greatest) locations in one
+        # dimension, or the (lower, upper) corners of a box in two or
+        # three.
+        self.reset_space()
+        self.agents = AgentRegistry()
+        # Future events as (time, sequence, agent_id, transmission)
+        # tuples.  A `transmission` of None means the agent acts at
+        # `time`, otherwise it reacts to the transmission.
+        self.events = []
+        self.event_sequence = count()
+        # End of the interval currently being simulated (or None
+        # between calls to `run_until`).
+        self.horizon = None
+        self.log_id = None
+        self.log_level = _LOG_DEFAULTS['level']
+        # Bounded buffer of (time, level, text) records (or None to
+        # keep no records).
+        self.log_buffer = None
+        self.log_stream = _LOG_DEFAULTS['stream']
+        self.configure_log(buffer_size=_LOG_DEFAULTS['buffer_size'])
+        # Every random draw in a simulation comes from these generators
+        # so that seeding them reproduces it.
+        self.seed = None
+        self.random = Random()
+        self._numpy_random = None
+        # Blocks are numbered in the order they are created.
+        self.block_ids = count(1)
+        # Callbacks for each event, in the order they subscribed.
+        self.subscribers = {}
+
+    def __enter__(self):
+        _CONTEXT.stack.append(_CONTEXT.simulation)
+        _CONTEXT.simulation = self
+        return self
+
+    def __exit__(self, *exception):
+        _CONTEXT.simulation = _CONTEXT.stack.pop()
+
+    #
+    # Log
+    #
+
+    def log(self, message, *args, level=LOG_DEBUG):
+        if level < self.log_level: return
+        record = (self.time, level, (message.format(*args) if args else message))
+        if self.log_buffer is not None:
+            self.log_buffer.append(record)
+        if self.log_stream is not None:
+            self.write_log_record(self.log_stream, record)
+
+    def log_enabled(self, level=LOG_DEBUG):
+        return level >= self.log_level
+
+    def configure_log(self, level=None, buffer_size=None, stream=None):
+        if level is not None:
+            self.log_level = (_LOG_LEVEL_NAMES[level.upper()] if isinstance(level, str) else level)
+        if buffer_size is not None:
+            self.log_buffer = (deque(self.log_buffer or [], maxlen=buffer_size) if buffer_size > 0 else None)
+        if stream is not None:
+            self.log_stream = stream
+
+    def log_records(self):
+        return list(self.log_buffer or [])
+
+    def print_log(self):
+        for record in self.log_records():
+            self.write_log_record(stderr, record)
+
+    def write_log_record(self, stream, record):
+        time, level, text = record
+        stream.write("{}{}\t{}\n".format(
+            "{}: ".format(self.log_id) if self.log_id is not None else "",
+            time,
+            text))
+
+    #
+    # Randomness
+    #
+
+    def seed_random(self, seed):
+        self.seed = seed
+        self.random.seed(seed)
+        self._numpy_random = None
+
+    @property
+    def numpy_random(self):
+        if self._numpy_random is None:
+            from numpy.random import default_rng
+            self._numpy_random = default_rng(self.random.getrandbits(64))
+        return self._numpy_random
+
+    #
+    # Events
+    #
+
+    def subscribe(self, event, callback):
+        self.subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event, callback):
+        self.subscribers[event].remove(callback)
+
+    def emit(self, event, *args):
+        callbacks = self.subscribers.get(event)
+        if callbacks:
+            for callback in callbacks:
+                callback(self.time, *args)
+
+    #
+    # Time
+    #
+
+    def advance_time(self, amount):
+        assert amount > 0
+        self.run_until(self.time + amount)
+
+    def run_until(self, end):
+        assert end > self.time
+        self.log("TIME => {} AGENTS {} EVENTS {}", end, len(self.agents), len(self.events))
+        self.horizon = end
+        duration = Duration(self.time, end)
+        for agent in self.agents.stepped_agents():
+            agent.advance(duration)
+        events = self.events
+        while events and events[0][0] <= end:
+            time, sequence, agent_id, transmission = heappop(events)
+            agent = self.agents.get(agent_id)
+            if agent is None: continue
+            if time > self.time:
+                self.time = time
+            if transmission is None:
+                if agent.scheduled_action != sequence: continue
+                agent.scheduled_action = None
+                agent.act(time)
+            else:
+                self.emit(TRANSMISSION_RECEIVED, agent, transmission)
+                agent.react(time, transmission)
+            self.schedule_action(agent)
+        self.time = end
+        self.horizon = None
+
+    def next_event_time(self):
+        return (self.events[0][0] if self.events else None)
+
+    def schedule_action(self, agent):
+        time = agent.next_action_time(self.time)
+        if time is None:
+            agent.scheduled_action = None
+            return
+        sequence = next(self.event_sequence)
+        agent.scheduled_action = sequence
+        heappush(self.events, (time, sequence, agent.id, None))
+
+    def schedule_reaction(self, time, agent, transmission):
+        heappush(self.events, (time, next(self.event_sequence), agent.id, transmission))
+
+    def transmit(self, transmission):
+        # Every agent within the spatial boundary (other than the
+        # source) receives the transmission once it has traveled
+        # their distance from the source.  Moving agents receive it
+        # wherever they are when it catches up with them.
+        self.log("TRANSMISSION {} FROM {} @ {}", transmission.id, transmission.source_agent.id, transmission.source)
+        for agent in self.agents.located_in(*self.space, sort=False):
+            if agent is transmission.source_agent: continue
+            agent.receive(transmission.reception_time(agent), transmission)
+        if self.agents.moving:
+            agents, trajectories = self.agents.moving_agents()
+            arrival_times = trajectories.arrival_times(transmission.source, transmission.transmission_time, transmission.speed)
+            for agent, arrival_time in zip(agents, arrival_times.tolist()):
+                if agent is transmission.source_agent: continue
+                agent.receive(arrival_time, transmission)
+
+    #
+    # Space
+    #
+
+    def set_spatial_boundary(self, x, y):
+        if is_vector(x):
+            x, y = tuple(x), tuple(y)
+            assert len(x) == len(y) and all(upper > lower for lower, upper in zip(x, y))
+        else:
+            assert y > x
+        self.space[0] = x
+        self.space[1] = y
+
+    #
+    # Agents
+    #
+
+    def add_agent(self, agent):
+        self.log("AGENT {} ADDED @ {}", agent.id, agent.location)
+        self.agents.add(agent)
+        if agent.stepped:
+            # Stepped agents added mid-interval (e.g. by another
+            # agent's action) catch up on the rest of the interval.
+            if self.horizon is not None and self.horizon > self.time:
+                agent.advance(Duration(self.time, self.horizon))
+        else:
+            self.schedule_action(agent)
+
+    def remove_agent(self, id):
+        self.log("AGENT {} DELETED", id)
+        self.agents.remove(id)
+
+    def agents_located_in(self, a, b):
+        assert is_vector(a) or b > a
+        return self.agents.located_in(a, b)
+
+    #
+    # Reset
+    #
+
+    def reset_time(self):
+        self.time = 0
+
+    def reset_log(self):
+        if self.log_buffer is not None:
+            self.log_buffer.clear()
+        self.log_id = None
+
+    def reset_space(self):
+        self.space = [0, 1]
+
+    def reset_agents(self):
+        self.agents = AgentRegistry()
+        self.events = []
+        self.horizon = None
+
+    def reset_subscribers(self):
+        self.subscribers = {}
+
+    def reset_block_ids(self):
+        self.block_ids = count(1)
+
+    def reset(self):
+        self.reset_space()
+        self.reset_agents()
+        self.reset_time()
+        self.reset_log()
+        self.reset_block_ids()
+        self.reset_subscribers()
+
+class _Context(local):
+
+    def __init__(self):
+        self.simulation = _DEFAULT_SIMULATION
+        self.stack = []
+
+class _LogFile(object):
+    """A log file which is only opened when first written to (so
+    processes which never log, e.g. idle pool workers, leave it alone)
+    and closed when the process exits.
+
+    Records are flushed line by line, as worker processes may exit
+    without running exit handlers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.lock = Lock()
+
+    def write(self, text):
+        if self.file is None:
+            with self.lock:
+                if self.file is None:
+                    self.file = open(self.path, 'a', buffering=1)
+                    at_exit(self.close)
+        self.file.write(text)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def _configure_log_from_environment():
     if environ.get('DEBUG'):
-        _print_log_line(_TIME, string)
+        _LOG_DEFAULTS['level'] = LOG_DEBUG
+        _LOG_DEFAULTS['stream'] = stderr
+    if environ.get('HASHWARS_LOG_LEVEL'):
+        _LOG_DEFAULTS['level'] = _LOG_LEVEL_NAMES[environ['HASHWARS_LOG_LEVEL'].upper()]
+    if environ.get('HASHWARS_LOG_BUFFER_SIZE'):
+        _LOG_DEFAULTS['buffer_size'] = int(environ['HASHWARS_LOG_BUFFER_SIZE'])
+    if environ.get('HASHWARS_LOG_FILE'):
+        _LOG_DEFAULTS['stream'] = _LogFile(environ['HASHWARS_LOG_FILE'])
+
+_configure_log_from_environment()
+
+_DEFAULT_SIMULATION = Simulation()
+
+_CONTEXT = _Context()
+
+def current_simulation():
+    return _CONTEXT.simulation
+
+#
+# Functions below operate on the current simulation.
+#
+
+def log(message, *args, level=LOG_DEBUG):
+    _CONTEXT.simulation.log(message, *args, level=level)
+
+def log_enabled(level=LOG_DEBUG):
+    return _CONTEXT.simulation.log_enabled(level)
+
+def configure_log(level=None, buffer_size=None, stream=None):
+    _CONTEXT.simulation.configure_log(level=level, buffer_size=buffer_size, stream=stream)
 
 def set_log_id(string):
-    global _LOG_ID
-    _LOG_ID = string
+    _CONTEXT.simulation.log_id = string
+
+def log_records():
+    return _CONTEXT.simulation.log_records()
 
 def print_log():
-    for time, string in _LOG:
-        _print_log_line(time, string)
+    """Prints the current simulation's buffered log records to STDERR.
+
+    Only warnings and errors are buffered by default, so raise the log
+    level (e.g. `configure_log(level=LOG_DEBUG)` before the run) to get
+    the full trail of what happened.
+    """
+    _CONTEXT.simulation.print_log()
+
+def seed_random(seed):
+    _CONTEXT.simulation.seed_random(seed)
+
+def current_random():
+    return _CONTEXT.simulation.random
+
+def current_numpy_random():
+    return _CONTEXT.simulation.numpy_random
+
+def next_block_id():
+    return next(_CONTEXT.simulation.block_ids)
 
-def _print_log_line(time, string):
-    stderr.write("{}{}\t{}\n".format(
-        "{}: ".format(_LOG_ID) if _LOG_ID is not None else "",
-        time,
-        string))
+def subscribe(event, callback):
+    _CONTEXT.simulation.subscribe(event, callback)
+
+def unsubscribe(event, callback):
+    _CONTEXT.simulation.unsubscribe(event, callback)
+
+def emit(event, *args):
+    _CONTEXT.simulation.emit(event, *args)
 
 def current_time():
-    return _TIME
+    return _CONTEXT.simulation.time
 
 def advance_time(amount):
-    assert amount > 0
-    global _TIME
-    duration_end = _TIME + amount
-    duration = Duration(_TIME, duration_end)
-    log("TIME => {} AGENTS {}".format(duration_end, len(_AGENTS)))
-    agents = [get_agent(agent_id) for agent_id in list(all_agent_ids())]
-    for agent in reversed(sorted(agents, key=lambda agent: agent.priority)):
-        agent.advance(duration)
-    _TIME = duration_end
+    _CONTEXT.simulation.advance_time(amount)
+
+def run_until(end):
+    _CONTEXT.simulation.run_until(end)
+
+def next_event_time():
+    return _CONTEXT.simulation.next_event_time()
+
+def schedule_action(agent):
+    _CONTEXT.simulation.schedule_action(agent)
+
+def schedule_reaction(time, agent, transmission):
+    _CONTEXT.simulation.schedule_reaction(time, agent, transmission)
+
+def transmit(transmission):
+    _CONTEXT.simulation.transmit(transmission)
 
 def get_spatial_boundary():
-    return _SPACE
+    return _CONTEXT.simulation.space
 
 def set_spatial_boundary(x, y):
-    assert y > x
-    _SPACE[0] = x
-    _SPACE[1] = y
+    _CONTEXT.simulation.set_spatial_boundary(x, y)
 
 def add_agent(agent):
-    log("AGENT {} ADDED @ {}".format(agent.id, agent.location))
-    _AGENTS[agent.id] = agent
+    _CONTEXT.simulation.add_agent(agent)
 
 def all_agent_ids():
-    return _AGENTS.keys()
+    return _CONTEXT.simulation.agents.ids()
 
 def get_agent(id):
-    return _AGENTS[id]
+    return _CONTEXT.simulation.agents[id]
 
 def remove_agent(id):
-    log("AGENT {} DELETED".format(id))
-    del _AGENTS[id]
+    _CONTEXT.simulation.remove_agent(id)
 
 def agents_located_in(a, b):
-    assert b > a
-    return (agent for agent in _AGENTS.values() if agent.location >= a and agent.location <= b)
+    return _CONTEXT.simulation.agents_located_in(a, b)
 
 def reset_time():
-    global _TIME
-    _TIME = 0
+    _CONTEXT.simulation.reset_time()
 
 def reset_log():
-    global _LOG, _LOG_ID
-    _LOG.clear()
-    _LOG_ID = None
+    _CONTEXT.simulation.reset_log()
+
+def reset_space():
+    _CONTEXT.simulation.reset_space()
 
 def reset_agents():
-    global _AGENTS
-    _AGENTS = {}
+    _CONTEXT.simulation.reset_agents()
 
 def reset_simulation():
-    reset_agents()
-    reset_time()
-    reset_log()
+    _CONTEXT.simulation.reset()
@@ -0,0 +1,193 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from math import cos, sin, pi
+from numbers import Real
+
+# NumPy is only imported once many trajectories are evaluated at once
+# (see `Trajectories`).
+
+# Arrival times are solved to within this many seconds (or this
+# fraction of the time, whichever is larger).
+_ARRIVAL_TOLERANCE = 1e-9
+_RELATIVE_ARRIVAL_TOLERANCE = 1e-12
+_MAX_ARRIVAL_ITERATIONS = 100
+
+class Trajectory(ABC):
+    """Where a moving agent is over time.
+
+    Locations are numbers in one-dimensional space and vectors in two
+    or three, as for agents which don't move.  Agents must move slower
+    than the transmissions which reach them.
+    """
+
+    @abstractmethod
+    def position(self, time):
+        """Returns the location at `time`."""
+
+class LinearTrajectory(Trajectory):
+    """Moves at a constant `velocity`, passing `origin` at `epoch`."""
+
+    def __init__(self, origin, velocity, epoch=0.0):
+        assert _dimensions(origin) == _dimensions(velocity)
+        self.origin = origin
+        self.velocity = velocity
+        self.epoch = epoch
+
+    def position(self, time):
+        elapsed = time - self.epoch
+        if isinstance(self.origin, Real):
+            return self.origin + (self.velocity * elapsed)
+        return tuple(coordinate + (rate * elapsed) for coordinate, rate in zip(self.origin, self.velocity))
+
+class TabulatedTrajectory(Trajectory):
+    """Interpolates linearly between `locations` at increasing `times`.
+
+    With a `period` (e.g. of an orbit), the table covers one period
+    from `times[0]` and repeats; otherwise locations are held before
+    the first time and after the last.
+    """
+
+    def __init__(self, times, locations, period=None):
+        assert len(times) == len(locations) and len(times) > 1
+        assert all(later > earlier for earlier, later in zip(times, times[1:]))
+        assert period is None or times[-1] - times[0] <= period
+        self.times = times
+        self.locations = locations
+        self.period = period
+
+    def table_time(self, time):
+        if self.period is None:
+            return min(max(time, self.times[0]), self.times[-1])
+        return self.times[0] + ((time - self.times[0]) % self.period)
+
+    def position(self, time):
+        time = self.table_time(time)
+        times, locations = self.times, self.locations
+        if time > times[-1]:
+            # Between the last location and the first of the next period.
+            start_time, end_time = times[-1], times[0] + self.period
+            start, end = locations[-1], locations[0]
+        else:
+            index = min(bisect_right(times, time), len(times) - 1)
+            start_time, end_time = times[index - 1], times[index]
+            start, end = locations[index - 1], locations[index]
+        fraction = (time - start_time) / (end_time - start_time)
+        if isinstance(start, Real):
+            return start + (fraction * (end - start))
+        return tuple(first + (fraction * (second - first)) for first, second in zip(start, end))
+
+def circular_orbit(radius, period, phase=0.0, center=(0.0, 0.0), samples=360):
+    """A tabulated circular orbit in the plane, starting at angle
+    `phase` (in radians) at time 0."""
+    times = [period * sample / samples for sample in range(samples)]
+    locations = [
+        (center[0] + radius * cos(phase + 2 * pi * time / period), center[1] + radius * sin(phase + 2 * pi * time / period))
+        for time in times
+    ]
+    return TabulatedTrajectory(times, locations, period=period)
+
+class Trajectories(object):
+    """Many trajectories, evaluated together in NumPy.
+
+    Linear trajectories are stacked into arrays of origins and
+    velocities, and tabulated trajectories with as many entries (and
+    all periodic, or none) into arrays of times and locations, so
+    positions of every trajectory (each at its own time) take a
+    handful of array operations.
+    """
+
+    def __init__(self, trajectories):
+        from numpy import array, concatenate
+        self.trajectories = list(trajectories)
+        dimensions = set(_dimensions(_first_location(trajectory)) for trajectory in self.trajectories)
+        assert len(dimensions) <= 1, "Trajectories must all be in the same space"
+        self.dimensions = (dimensions.pop() if dimensions else 1)
+
+        linear = [index for index, trajectory in enumerate(self.trajectories) if isinstance(trajectory, LinearTrajectory)]
+        self.linear = (
+            array(linear, dtype=int),
+            self._vectors([self.trajectories[index].origin for index in linear]),
+            self._vectors([self.trajectories[index].velocity for index in linear]),
+            array([self.trajectories[index].epoch for index in linear], dtype=float))
+
+        groups = {}
+        for index, trajectory in enumerate(self.trajectories):
+            if isinstance(trajectory, TabulatedTrajectory):
+                groups.setdefault((len(trajectory.times), trajectory.period is not None), []).append(index)
+            else:
+                assert isinstance(trajectory, LinearTrajectory), "Unknown trajectory {}".format(trajectory)
+        self.tabulated = []
+        for (length, periodic), indices in groups.items():
+            times = array([self.trajectories[index].times for index in indices], dtype=float)
+            locations = array([self._vectors(self.trajectories[index].locations) for index in indices])
+            periods = None
+            if periodic:
+                periods = array([self.trajectories[index].period for index in indices], dtype=float)
+                # Close each loop so every table time has a successor.
+                times = concatenate((times, (times[:, 0] + periods)[:, None]), axis=1)
+                locations = concatenate((locations, locations[:, :1]), axis=1)
+            self.tabulated.append((array(indices, dtype=int), times, locations, periods))
+
+    def __len__(self):
+        return len(self.trajectories)
+
+    def _vectors(self, locations):
+        from numpy import array
+        return array(locations, dtype=float).reshape((len(locations), self.dimensions))
+
+    def positions(self, times):
+        """Positions (one row per trajectory) of each trajectory at the
+        corresponding time in `times`."""
+        from numpy import zeros, clip, arange
+        positions = zeros((len(self.trajectories), self.dimensions))
+
+        indices, origins, velocities, epochs = self.linear
+        if len(indices):
+            positions[indices] = origins + velocities * (times[indices] - epochs)[:, None]
+
+        for indices, table_times, locations, periods in self.tabulated:
+            group_times = times[indices]
+            if periods is None:
+                group_times = clip(group_times, table_times[:, 0], table_times[:, -1])
+            else:
+                group_times = table_times[:, 0] + ((group_times - table_times[:, 0]) % periods)
+            # Each row's table times are sorted, so counting those at
+            # or before a time finds the entry after it.
+            after = clip((table_times <= group_times[:, None]).sum(axis=1), 1, table_times.shape[1] - 1)
+            before = after - 1
+            rows = arange(len(indices))
+            fractions = (group_times - table_times[rows, before]) / (table_times[rows, after] - table_times[rows, before])
+            starts = locations[rows, before]
+            positions[indices] = starts + (locations[rows, after] - starts) * fractions[:, None]
+        return positions
+
+    def arrival_times(self, source, emission_time, speed=1.0):
+        """When a signal emitted from `source` at `emission_time`,
+        traveling at `speed`, reaches each trajectory.
+
+        Solves `|position(t) - source| = speed * (t - emission_time)`
+        for every trajectory at once by fixed-point iteration: each
+        estimate is the time the signal would take to reach where the
+        trajectory was at the previous estimate.  This converges (in a
+        few iterations for agents much slower than the signal) because
+        a trajectory slower than the signal can't outrun it.
+        """
+        from numpy import full, allclose, sqrt
+        source = self._vectors([source])[0]
+        times = full(len(self.trajectories), float(emission_time))
+        for iteration in range(_MAX_ARRIVAL_ITERATIONS):
+            offsets = self.positions(times) - source
+            new_times = emission_time + sqrt((offsets * offsets).sum(axis=1)) / speed
+            converged = allclose(new_times, times, rtol=_RELATIVE_ARRIVAL_TOLERANCE, atol=_ARRIVAL_TOLERANCE)
+            times = new_times
+            if converged:
+                return times
+        raise ValueError("Arrival times did not converge (are agents moving faster than {}?)".format(speed))
+
+def _dimensions(location):
+    return (1 if isinstance(location, Real) else len(location))
+
+def _first_location(trajectory):
+    if isinstance(trajectory, LinearTrajectory):
+        return trajectory.origin
+    return trajectory.locations[0]
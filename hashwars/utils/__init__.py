@@ -1,32 +1,69 @@
 from sys import stdout, stderr, stdin
-from pickle import dumps, loads
-from random import choice, random
+from pickle import dumps, loads, dump, load, UnpicklingError
+import random as _random
 from string import ascii_lowercase
 
-from numpy import arange, array, concatenate
-
 from .duration import Duration
+from .sampling import ExponentialSampler, derive_seed
+from .columnar import write_columnar, read_columnar, is_columnar, MAGIC as COLUMNAR_MAGIC
 
-def random_string(length=10):
-    return ''.join(choice(ascii_lowercase) for i in range(length))
+def random_string(length=10, generator=None):
+    generator = (generator or _random)
+    return ''.join(generator.choice(ascii_lowercase) for i in range(length))
 
-def write_results(results, output_file):
-    output = dumps(results)
-    if output_file:
-        output_file.write(output)
-    else:
+def write_results(results, output_file, format='pickle'):
+    if output_file is None:
         if stdout.isatty():
             notify("ERROR: Attempting to write binary results data to STDOUT")
-        else:
-            stdout.buffer.write(output)
+            return
+        output_file = stdout.buffer
+    if format == 'columnar':
+        write_columnar(results, output_file)
+    else:
+        output_file.write(dumps(results))
 
+# Detects whether results were written as a pickle or in columnar
+# format.  Columnar results in a file on disk are memory-mapped.
 def read_results(input_file):
-    return loads((input_file or stdin.buffer).read())
+    if input_file is not None and input_file.seekable():
+        columnar = is_columnar(input_file.read(len(COLUMNAR_MAGIC)))
+        input_file.seek(0)
+        if columnar:
+            return read_columnar(input_file)
+        return loads(input_file.read())
+    data = (input_file or stdin.buffer).read()
+    if is_columnar(data):
+        return read_columnar(data=data)
+    return loads(data)
+
+def append_result(result, output_file):
+    dump(result, output_file)
+    output_file.flush()
+
+# Reads every result appended to the file at `path`, truncating a
+# partially written result at its end (e.g. after a crash).
+def read_appended_results(path):
+    results = []
+    try:
+        input_file = open(path, 'r+b')
+    except FileNotFoundError:
+        return results
+    with input_file:
+        end = 0
+        while True:
+            try:
+                results.append(load(input_file))
+                end = input_file.tell()
+            except (EOFError, UnpicklingError, ValueError, AttributeError, IndexError):
+                break
+        input_file.truncate(end)
+    return results
 
 # 0.1,0.5,0.8,1.0,1.2 => array([0.1, 0.5, 0.8, 1.0, 1.2])
 # [1,5,1] => array([1.0, 2.0, 3.0, 4.0])
 # [0.1,1,0.3][1,5,1] => array([0.1, 0.4, 0.7, 1.0, 2.0, 3.0, 4.0])
 def array_glob(spec):
+    from numpy import arange, array, concatenate
     if spec.startswith('['):
         subarray_specs = spec[1:-1].split('][')
         values = array([])
@@ -0,0 +1,140 @@
+from json import dumps as json_dumps, loads as json_loads
+from os import fstat, stat
+from os.path import samestat
+from stat import S_ISREG
+from pickle import dumps, loads
+from struct import pack, unpack
+
+#
+# Columnar results are a small JSON header followed by the raw bytes
+# of each array (aligned, so they can be memory-mapped):
+#
+#   MAGIC | header length (uint64) | header | padding | array | ...
+#
+# Each item of a results tuple becomes an array when it converts to
+# a numeric NumPy array, a JSON value when it is a scalar, and a
+# pickled blob otherwise.
+#
+# NumPy is only imported once columnar results are read or written.
+#
+
+MAGIC = b'HWCOLS1\n'
+
+_ALIGNMENT = 64
+
+def is_columnar(data):
+    return data[:len(MAGIC)] == MAGIC
+
+def write_columnar(results, output_file):
+    is_tuple = isinstance(results, (tuple, list))
+    items = (list(results) if is_tuple else [results])
+
+    columns = []
+    blobs = []
+    for item in items:
+        column, blob = _column(item)
+        columns.append(column)
+        blobs.append(blob)
+
+    # Offsets depend on the header's length, which depends on the
+    # offsets, so reserve a fixed amount of room for them.
+    header = {'tuple': is_tuple, 'columns': columns}
+    for column in columns:
+        if 'offset' in column:
+            column['offset'] = 10 ** 15
+    reserved_header_length = len(json_dumps(header).encode())
+    offset = _aligned(len(MAGIC) + 8 + reserved_header_length)
+    for column, blob in zip(columns, blobs):
+        if 'offset' in column:
+            column['offset'] = offset
+            offset = _aligned(offset + len(blob))
+    header_bytes = json_dumps(header).encode().ljust(reserved_header_length)
+
+    output_file.write(MAGIC)
+    output_file.write(pack('<Q', len(header_bytes)))
+    output_file.write(header_bytes)
+    position = len(MAGIC) + 8 + len(header_bytes)
+    for column, blob in zip(columns, blobs):
+        if 'offset' in column:
+            output_file.write(b'\0' * (column['offset'] - position))
+            output_file.write(blob)
+            position = column['offset'] + len(blob)
+
+def read_columnar(input_file=None, data=None):
+    """Read columnar results from `input_file` or from `data` bytes.
+
+    Arrays are memory-mapped when reading from a file on disk, so only
+    the slices actually used are loaded.  Any other stream (e.g. a pipe
+    or a `BytesIO`) is read into memory.
+    """
+    from numpy import memmap, frombuffer, dtype as numpy_dtype
+    if data is None and not _is_mappable(input_file):
+        data = input_file.read()
+    if data is None:
+        prefix = input_file.read(len(MAGIC) + 8)
+    else:
+        prefix = data[:len(MAGIC) + 8]
+    assert is_columnar(prefix), "Not columnar results"
+    header_length, = unpack('<Q', prefix[len(MAGIC):])
+    if data is None:
+        header = json_loads(input_file.read(header_length).decode())
+    else:
+        header = json_loads(data[len(MAGIC) + 8:len(MAGIC) + 8 + header_length].decode())
+
+    items = []
+    for column in header['columns']:
+        if column['kind'] == 'value':
+            items.append(column['value'])
+        elif column['kind'] == 'array':
+            shape = tuple(column['shape'])
+            dtype = numpy_dtype(column['dtype'])
+            if data is None:
+                items.append(memmap(input_file.name, dtype=dtype, mode='r', offset=column['offset'], shape=shape))
+            else:
+                items.append(frombuffer(data, dtype=dtype, count=_size(shape), offset=column['offset']).reshape(shape))
+        else:
+            if data is None:
+                input_file.seek(column['offset'])
+                blob = input_file.read(column['length'])
+            else:
+                blob = data[column['offset']:column['offset'] + column['length']]
+            items.append(loads(blob))
+    return (tuple(items) if header['tuple'] else items[0])
+
+# Whether `input_file` is a regular file on disk which can be found by
+# its name (unlike, say, `sys.stdin` redirected from one).
+def _is_mappable(input_file):
+    name = getattr(input_file, 'name', None)
+    if not isinstance(name, (str, bytes)):
+        return False
+    try:
+        status = fstat(input_file.fileno())
+        return S_ISREG(status.st_mode) and samestat(status, stat(name))
+    except (OSError, ValueError, AttributeError):
+        return False
+
+def _column(item):
+    from numpy import asarray, ndarray, generic
+    if isinstance(item, generic):
+        item = item.item()
+    if item is None or isinstance(item, (bool, int, float, str)):
+        return ({'kind': 'value', 'value': item}, None)
+    if isinstance(item, (ndarray, list, tuple)):
+        try:
+            array = asarray(item)
+        except ValueError:
+            array = None
+        if array is not None and array.dtype.kind in 'biuf' and array.size > 0:
+            array = array.astype(array.dtype.newbyteorder('<'))
+            return ({'kind': 'array', 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': None}, array.tobytes(order='C'))
+    blob = dumps(item)
+    return ({'kind': 'pickle', 'length': len(blob), 'offset': None}, blob)
+
+def _aligned(offset):
+    return offset + ((-offset) % _ALIGNMENT)
+
+def _size(shape):
+    size = 1
+    for dimension in shape:
+        size *= dimension
+    return size
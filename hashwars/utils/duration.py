@@ -1,4 +1,4 @@
-from random import random
+import random as _random
 
 class Duration(object):
 
@@ -19,5 +19,5 @@ class Duration(object):
         if time > self.end: return False
         return True
 
-    def random_time(self):
-        return self.start + (self.length * random())
+    def random_time(self, generator=None):
+        return self.start + (self.length * (generator or _random).random())
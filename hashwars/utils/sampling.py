@@ -0,0 +1,39 @@
+import random as _random
+from hashlib import sha256
+from json import dumps as json_dumps
+
+class ExponentialSampler(object):
+    """Draws exponentially distributed variates with unit mean from
+    `generator` (a `random.Random`, by default the `random` module).
+
+    With a `batch_size`, variates are drawn through a NumPy generator
+    (seeded from `generator`) that many at a time and handed out one
+    by one.
+    """
+
+    def __init__(self, batch_size=None, generator=None):
+        self.batch_size = batch_size
+        self.generator = (generator if generator is not None else _random)
+        self.numpy_generator = None
+        self.batch = []
+
+    def draw(self):
+        if not self.batch_size:
+            return self.generator.expovariate(1.0)
+        if not self.batch:
+            if self.numpy_generator is None:
+                from numpy.random import default_rng
+                self.numpy_generator = default_rng(self.generator.getrandbits(64))
+            self.batch = self.numpy_generator.standard_exponential(self.batch_size).tolist()
+        return self.batch.pop()
+
+def derive_seed(seed, *keys):
+    """Derives an independent 64-bit seed for the run identified by
+    `keys` (e.g. distance, hashrate ratio, and replica) from `seed`.
+
+    Without a `seed`, returns a fresh seed from the operating system.
+    """
+    if seed is None:
+        return _random.SystemRandom().getrandbits(64)
+    digest = sha256(json_dumps([seed] + [float(key) for key in keys]).encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
@@ -1,7 +1,7 @@
 from argparse import ArgumentParser
 
 import matplotlib.pyplot as plt
-from numpy import array
+from numpy import array, asarray, searchsorted
 
 from hashwars import write_plot, COLORS, format_percent
 
@@ -10,6 +10,8 @@ _DEFAULT_HEIGHT = 8
 _DEFAULT_DPI = 100
 
 _parser = ArgumentParser(description="Plot of a blockchain launch's history.")
+_parser.add_argument("-t", "--min-time", help="ignore times before this time", metavar="SECONDS", type=float)
+_parser.add_argument("-T", "--max-time", help="ignore times after this time", metavar="SECONDS", type=float)
 _parser.add_argument("-X", "--figure-width", help="figure width in inches", metavar="WIDTH", type=float, default=_DEFAULT_WIDTH)
 _parser.add_argument("-Y", "--figure-height", help="figure height in inches", metavar="HEIGHT", type=float, default=_DEFAULT_HEIGHT)
 _parser.add_argument("-Z", "--resolution", help="resolution in DPI", metavar="DPI", type=float, default=_DEFAULT_DPI)
@@ -26,6 +28,17 @@ def blockchain_launch_history(results, output_file, argv):
     ) = results
     args = _parser.parse_args(argv)
 
+    # Only the selected window of (possibly memory-mapped) series is
+    # loaded.
+    times = asarray(times)
+    start = (searchsorted(times, args.min_time, side='left') if args.min_time is not None else 0)
+    end = (searchsorted(times, args.max_time, side='right') if args.max_time is not None else len(times))
+    times = times[start:end]
+    minority_miners_minority_weight = asarray(minority_miners_minority_weight)[start:end]
+    minority_miners_majority_weight = asarray(minority_miners_majority_weight)[start:end]
+    majority_miners_minority_weight = asarray(majority_miners_minority_weight)[start:end]
+    majority_miners_majority_weight = asarray(majority_miners_majority_weight)[start:end]
+
     max_weight = max(
         max(minority_miners_minority_weight) + max(minority_miners_majority_weight),
         max(majority_miners_minority_weight) + max(majority_miners_majority_weight))
@@ -39,7 +52,7 @@ def blockchain_launch_history(results, output_file, argv):
     minority_weight.set_title("Minority (Distance: {}, Final {})".format(distance, format_percent(minority_miners_minority_weight[-1]/(minority_miners_minority_weight[-1] + minority_miners_majority_weight[-1]), places=2)))
     minority_weights_stackplot = minority_weight.stackplot(times, minority_miners_minority_weight, minority_miners_majority_weight, labels=['Mined by Minority', 'Mined by Majority'], colors=[COLORS['mars'], COLORS['earth']], baseline='zero')
     minority_weight.set_ylim(0, max_weight)
-    minority_weight.set_xlim(0, times[-1])
+    minority_weight.set_xlim((args.min_time or 0), times[-1])
     minority_weight.set_ylabel('Weight')
     minority_weight.axvline(x=distance, color='gray', linestyle='--', linewidth=0.5)
     minority_weight.axvline(x=(2 * distance), color='gray', linestyle='--', linewidth=0.5)
@@ -57,7 +70,7 @@ def blockchain_launch_history(results, output_file, argv):
     majority_weight.set_title("On Majority ({}x hashrate ratio)".format(hashrate_ratio))
     majority_weights_stackplot = majority_weight.stackplot(times, majority_miners_minority_weight, majority_miners_majority_weight, labels=['Mined by Minority', 'Mined by Majority'], colors=[COLORS['mars'], COLORS['earth']])
     majority_weight.set_ylim(0, max_weight)
-    minority_weight.set_xlim(0, times[-1])
+    minority_weight.set_xlim((args.min_time or 0), times[-1])
     majority_weight.set_ylabel('Weight')
     majority_weight.axvline(x=distance, color=COLORS['white'], linestyle='--', linewidth=0.5)
     majority_weight.axvline(x=(2 * distance), color=COLORS['white'], linestyle='--', linewidth=0.5)
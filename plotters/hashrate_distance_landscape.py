@@ -2,7 +2,7 @@ from argparse import ArgumentParser
 
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
-from numpy import mean, std, where, full, array
+from numpy import nanmean, nanstd, where, full, asarray
 
 from hashwars import write_plot, array_glob, COLORS, moving_average, format_percent
 
@@ -29,7 +29,7 @@ def hashrate_distance_landscape(results, output_file, argv):
         distances,
         hashrate_ratios,
         minority_weights_fractions
-    ) = results
+    ) = results[:3]
 
     args = _parser.parse_args(argv)
 
@@ -37,8 +37,8 @@ def hashrate_distance_landscape(results, output_file, argv):
 
     hashrate_fractions = 1/(1+hashrate_ratios)
         
-    minority_weights_fractions_means = mean(minority_weights_fractions, axis=2)
-    minority_weights_fractions_stds = std(minority_weights_fractions, axis=2)
+    minority_weights_fractions_means = nanmean(minority_weights_fractions, axis=2)
+    minority_weights_fractions_stds = nanstd(minority_weights_fractions, axis=2)
 
     fig, axes = plt.subplots(
         figsize=(args.figure_width, args.figure_height),
@@ -146,7 +146,7 @@ def _ignore_data(distances, hashrate_ratios, minority_weights_fractions, args):
 
     distances = distances[distances_filter]
     hashrate_ratios = hashrate_ratios[hashrate_ratios_filter]
-    minority_weights_fractions = array(minority_weights_fractions)
+    minority_weights_fractions = asarray(minority_weights_fractions)
     minority_weights_fractions = minority_weights_fractions[distances_filter]
     minority_weights_fractions = minority_weights_fractions.transpose(1, 0, 2)[hashrate_ratios_filter].transpose(1, 0, 2)
 
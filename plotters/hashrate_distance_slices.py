@@ -1,7 +1,7 @@
 from argparse import ArgumentParser
 
 import matplotlib.pyplot as plt
-from numpy import array, mean, var
+from numpy import array, nanmean, nanvar
 
 from hashwars import write_plot, COLORS, moving_average, format_percent
 
@@ -24,13 +24,13 @@ def hashrate_distance_slices(results, output_file, argv):
         distances,
         hashrate_ratios,
         minority_weights_fractions
-    ) = results
+    ) = results[:3]
 
     args = _parser.parse_args(argv)
 
     hashrate_fractions = list(reversed(1/(1+hashrate_ratios)))
-    minority_weights_fractions_means = mean(minority_weights_fractions, axis=2)
-    minority_weights_fractions_vars = var(minority_weights_fractions, axis=2)
+    minority_weights_fractions_means = nanmean(minority_weights_fractions, axis=2)
+    minority_weights_fractions_vars = nanvar(minority_weights_fractions, axis=2)
 
     fig, ax = plt.subplots(
         nrows=1, 
@@ -10,18 +10,26 @@ _DEFAULT_STEP_VARIANCE = 0.1    # fraction of step size
 
 _DEFAULT_PREMIUM = 1.0
 
+_DEFAULT_RETARGET_PERIOD = 2016 # blocks
+
 _parser = ArgumentParser(description="The launch of a blockchain.")
 _parser.add_argument("-t", "--min_time", help="Minimum simulation length (in seconds)", type=float, default=_DEFAULT_MIN_TIME)
 _parser.add_argument("-R", "--time_distance_ratio", help="Set simulation length to this multiple of distance", type=float, default=_DEFAULT_TIME_DISTANCE_RATIO)
 _parser.add_argument("--steps", help="Number of steps", type=int, default=_DEFAULT_STEPS)
+_parser.add_argument("--sampling", help="Report weights at every step or at every time they change", choices=('steps', 'events'), default='steps')
+_parser.add_argument("--decimation", help="With event sampling, keep at most one change of each weight per this many seconds", type=float)
 _parser.add_argument("--premium", help="Hash premium", type=float, default=_DEFAULT_PREMIUM)
+_parser.add_argument("--retarget", help="Readjust difficulty every period", action='store_true')
+_parser.add_argument("--retarget_period", help="Blocks per difficulty period", type=int, default=_DEFAULT_RETARGET_PERIOD)
+_parser.add_argument("--propagation", help="Transmit whole blockchains or single blocks", choices=(PROPAGATE_CHAIN, PROPAGATE_BLOCK), default=PROPAGATE_CHAIN)
+_parser.add_argument("--batch_draws", help="Draw mining times through NumPy this many at a time", type=int, metavar="COUNT")
 
 class MajorityMiners(Miners):
     
     def react(self, time,  transmission):
         if (not self.active) and isinstance(transmission, (BlockchainLaunch,)):
             self.active = True
-            log("MINER {} ACTIVATING".format(self.id))
+            log("MINER {} ACTIVATING", self.id, level=LOG_INFO)
         Miners.react(self, time, transmission)
 
 class BlockchainLaunch(Transmission):
@@ -37,62 +45,59 @@ def _launch(params, mode):
     distance, hashrate_ratio, argv = params
     distance = float(distance)
     hashrate_ratio = float(hashrate_ratio)
-    args = _parser.parse_args(argv)
+    args = parse_simulator_argv(_parser, argv)
     
-    run_id = random_string()
     reset_simulation()
+    run_id = random_string(generator=current_random())
     set_log_id(run_id)
     set_spatial_boundary(-1, distance + 1)
 
+    sampler = ExponentialSampler(batch_size=args.batch_draws, generator=current_random())
+
     genesis_block = Block("genesis", None, difficulty=600, height=1, time=current_time())
-    minority_blockchain = Blockchain("minority", genesis_block)
-    majority_blockchain = Blockchain("majority", genesis_block)
-    minority_miners  = Miners("minority-miners", 0, minority_blockchain, initial_hashrate=1.0)
-    majority_miners = MajorityMiners("majority-miners", distance, majority_blockchain, initial_hashrate=hashrate_ratio, difficulty_premium=args.premium, active=(mode == 'miner'))
+    minority_blockchain = Blockchain("minority", genesis_block, difficulty_readjustment_period=args.retarget_period, retarget=args.retarget)
+    majority_blockchain = Blockchain("majority", genesis_block, difficulty_readjustment_period=args.retarget_period, retarget=args.retarget)
+    minority_miners  = Miners("minority-miners", 0, minority_blockchain, initial_hashrate=1.0, sampler=sampler, propagation=args.propagation)
+    majority_miners = MajorityMiners("majority-miners", distance, majority_blockchain, initial_hashrate=hashrate_ratio, difficulty_premium=args.premium, active=(mode == 'miner'), sampler=sampler, propagation=args.propagation)
 
     add_agent(minority_miners)
     add_agent(majority_miners)
 
     if mode == 'blockchain':
         genesis_block_mined = BlockchainLaunch("genesis-mined", minority_miners, current_time())
-        add_agent(genesis_block_mined)
+        transmit(genesis_block_mined)
     
-    times = []
-    minority_miners_minority_weight = []
-    minority_miners_majority_weight = []
-    majority_miners_minority_weight = []
-    majority_miners_majority_weight = []
+    # Weights are recorded as they change rather than polled.
+    decimation = (args.decimation if args.sampling == 'events' else None)
+    probes = [
+        WeightProbe(blockchain, miners.id, start_time=current_time(), decimation=decimation)
+        for blockchain in (minority_blockchain, majority_blockchain)
+        for miners in (minority_miners, majority_miners)
+    ]
 
-    max_time = (distance * args.time_distance_ratio)
-    if max_time < args.min_time: max_time = args.min_time
+    max_time = _max_time(distance, args)
 
     step = max_time / args.steps
-    steps_taken = 0
-    while current_time() < max_time:
-        advance_time(_jitter(step))
-        steps_taken += 1
-
-        times.append(current_time())
-
-        if minority_miners.blockchain.height > 1:
-            minority_miners_minority_weight.append(sum([block.weight for block in minority_miners.blockchain.blocks.values() if minority_miners.id in block.id]))
-            minority_miners_majority_weight.append(sum([block.weight for block in minority_miners.blockchain.blocks.values() if majority_miners.id in block.id]))
-        else:
-            minority_miners_minority_weight.append(0)
-            minority_miners_majority_weight.append(0)
-
-        if majority_miners.blockchain.height > 1:
-            majority_miners_minority_weight.append(sum([block.weight for block in majority_miners.blockchain.blocks.values() if minority_miners.id in block.id]))
-            majority_miners_majority_weight.append(sum([block.weight for block in majority_miners.blockchain.blocks.values() if majority_miners.id in block.id]))
-        else:
-            majority_miners_minority_weight.append(0)
-            majority_miners_majority_weight.append(0)
+    if args.sampling == 'steps':
+        times = [current_time()]
+        while times[-1] < max_time:
+            times.append(times[-1] + _jitter(step))
+        times = times[1:]
+        run_until(times[-1])
+    else:
+        run_until(max_time)
+        times = sorted(set(time for probe in probes for time in probe.series.times) | {max_time})
+
+    (minority_miners_minority_weight,
+     minority_miners_majority_weight,
+     majority_miners_minority_weight,
+     majority_miners_majority_weight) = [probe.series.sample(times) for probe in probes]
 
     notify("FINISHED {}: T={:0.4f} S={:0.4f} N={} | D={:0.4f} | HR={:0.4f} | Minority={:0.4f}".format(
         run_id,
         max_time,
         step,
-        steps_taken,
+        len(times),
         distance,
         hashrate_ratio,
         minority_miners_minority_weight[-1] / (minority_miners_minority_weight[-1] + minority_miners_majority_weight[-1])
@@ -107,8 +112,13 @@ def _launch(params, mode):
         majority_miners_majority_weight,
     )
 
+def _max_time(distance, args):
+    max_time = (distance * args.time_distance_ratio)
+    if max_time < args.min_time: max_time = args.min_time
+    return max_time
+
 def _jitter(step):
-    return (step * (1 - _DEFAULT_STEP_VARIANCE/2)) + (step * _DEFAULT_STEP_VARIANCE * random())
+    return (step * (1 - _DEFAULT_STEP_VARIANCE/2)) + (step * _DEFAULT_STEP_VARIANCE * current_random().random())
 
 def blockchain_launch_minority_weight_fraction(params):
     return _minority_weight_fraction(blockchain_launch(params))
@@ -127,3 +137,23 @@ def _minority_weight_fraction(results):
     ) = results
     minority_weight_fraction = minority_miners_minority_weight[-1] / (minority_miners_minority_weight[-1] + minority_miners_majority_weight[-1])
     return (distance, hashrate_ratio, minority_weight_fraction)
+
+@replicated
+def blockchain_launch_ensemble_minority_weight_fraction(params, replicas):
+    return _ensemble_minority_weight_fraction(params, replicas, 'blockchain')
+
+@replicated
+def miner_launch_ensemble_minority_weight_fraction(params, replicas):
+    return _ensemble_minority_weight_fraction(params, replicas, 'miner')
+
+def _ensemble_minority_weight_fraction(params, replicas, mode):
+    distance, hashrate_ratio, argv = params
+    distance = float(distance)
+    hashrate_ratio = float(hashrate_ratio)
+    args = parse_simulator_argv(_parser, argv)
+    assert not args.retarget, "The ensemble engine runs at a fixed difficulty"
+    from hashwars.ensemble import launch_ensemble, MINORITY
+    weights = launch_ensemble(distance, hashrate_ratio, replicas, _max_time(distance, args), mode=mode, premium=args.premium, generator=current_numpy_random())
+    minority_weights = weights[:, MINORITY]
+    minority_weight_fractions = minority_weights[:, MINORITY] / minority_weights.sum(axis=1)
+    return [(distance, hashrate_ratio, minority_weight_fraction) for minority_weight_fraction in minority_weight_fractions.tolist()]
@@ -1,8 +1,8 @@
 from argparse import ArgumentParser
 from datetime import datetime, timedelta
-from math import ceil
+from math import ceil, nan
 
-from numpy import nan
+from hashwars import parse_simulator_argv
 
 # 0     1   2         3        4        5      6           7          8
 # Block Era BTC/block StartBTC BTCAdded EndBTC BTCIncrease %increase %made
@@ -46,7 +46,7 @@ _parser = ArgumentParser(description="Produces bitcoin money supply.")
 
 def money_supply(params):
     distance, hashrate, argv = params
-    args = _parser.parse_args(argv)
+    args = parse_simulator_argv(_parser, argv)
 
     genesis = datetime(2009, 1, 1)
     heights = []
@@ -0,0 +1,31 @@
+from test.base import *
+
+class TestPoissonAgent(object):
+
+    def setup(self):
+        reset_simulation()
+        seed_random(1)
+        self.agent = PoissonAgent('poisson', 0)
+
+    def test_no_actions_when_inactive(self):
+        self.agent.active = False
+        assert self.agent.actions_for(Duration(0, 100)) == []
+        assert self.agent.next_action_time(0) is None
+
+    def test_action_times_fall_within_duration_in_order(self):
+        times = self.agent.action_times_for(Duration(10, 20))
+        assert times == sorted(times)
+        assert all(10 < time <= 20 for time in times)
+
+    def test_number_of_actions_is_not_truncated_for_long_durations(self):
+        assert 900 < self.agent.number_of_actions_for(Duration(0, 1000)) < 1100
+
+    def test_max_actions_per_advance_truncates(self):
+        agent = PoissonAgent('poisson', 0, max_actions_per_advance=3)
+        assert agent.number_of_actions_for(Duration(0, 1000)) == 3
+
+    def test_batched_sampler_draws_unit_mean_variates(self):
+        sampler = ExponentialSampler(batch_size=64, generator=current_random())
+        draws = [sampler.draw() for _ in range(10000)]
+        assert all(draw >= 0 for draw in draws)
+        assert 0.95 < sum(draws) / len(draws) < 1.05
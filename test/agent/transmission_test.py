@@ -4,80 +4,97 @@ class TestTransmission(object):
 
     def setup(self):
         reset_simulation()
+        set_spatial_boundary(0, 1)
         self.source_agent = Agent('source', 0.5)
         self.transmission = Transmission('transmission', self.source_agent, current_time())
         self.near_target = Agent('near', 0.4)
         self.far_target = Agent('far', 0.9)
         add_agent(self.source_agent)
-        add_agent(self.transmission)
         add_agent(self.near_target)
         add_agent(self.far_target)
 
-    def test_receive(self):
-        other_transmission = Transmission('other-transmission', self.near_target, current_time())
-        self.transmission.receive(other_transmission, current_time() + 0.1)
-        assert len(self.transmission.transmissions_received) == 0
+    def test_reception_time_is_distance_over_speed(self):
+        assert self.transmission.reception_time(self.near_target) == approx(0.1)
+        assert self.transmission.reception_time(self.far_target) == approx(0.4)
+        self.transmission.speed = 2.0
+        assert self.transmission.reception_time(self.far_target) == approx(0.2)
+
+    def test_transmit_schedules_every_reception_at_once(self):
+        with patch.object(self.source_agent, 'receive') as source_agent_receive:
+            with patch.object(self.near_target, 'receive') as near_target_receive:
+                with patch.object(self.far_target, 'receive') as far_target_receive:
+                    transmit(self.transmission)
+                    assert not source_agent_receive.called
+                    near_target_receive.assert_called_once_with(approx(0.1), self.transmission)
+                    far_target_receive.assert_called_once_with(approx(0.4), self.transmission)
+
+    def test_transmission_is_not_an_agent(self):
+        transmit(self.transmission)
+        assert self.transmission.id not in all_agent_ids()
 
     def test_advance_once_without_reaching_any_targets(self):
-        with patch.object(self.transmission, 'receive') as transmission_receive:
-            with patch.object(self.source_agent, 'receive') as source_agent_receive:
-                with patch.object(self.near_target, 'receive') as near_target_receive:
-                    with patch.object(self.far_target, 'receive') as far_target_receive:
-                        advance_time(0.09)
-                        assert not transmission_receive.called
-                        assert not source_agent_receive.called
-                        assert not near_target_receive.called
-                        assert not far_target_receive.called
+        transmit(self.transmission)
+        with patch.object(self.source_agent, 'react') as source_agent_react:
+            with patch.object(self.near_target, 'react') as near_target_react:
+                with patch.object(self.far_target, 'react') as far_target_react:
+                    advance_time(0.09)
+                    assert not source_agent_react.called
+                    assert not near_target_react.called
+                    assert not far_target_react.called
 
     def test_advance_once_reaching_near_target(self):
-        with patch.object(self.transmission, 'receive') as transmission_receive:
-            with patch.object(self.source_agent, 'receive') as source_agent_receive:
-                with patch.object(self.near_target, 'receive') as near_target_receive:
-                    with patch.object(self.far_target, 'receive') as far_target_receive:
-                        advance_time(0.11)
-                        assert not transmission_receive.called
-                        assert not source_agent_receive.called
-                        assert near_target_receive.called
-                        assert not far_target_receive.called
+        transmit(self.transmission)
+        with patch.object(self.near_target, 'react') as near_target_react:
+            with patch.object(self.far_target, 'react') as far_target_react:
+                advance_time(0.11)
+                near_target_react.assert_called_once_with(approx(0.1), self.transmission)
+                assert not far_target_react.called
 
-    def test_advance_once_reaching_both_targets(self):
-        with patch.object(self.transmission, 'receive') as transmission_receive:
-            with patch.object(self.source_agent, 'receive') as source_agent_receive:
-                with patch.object(self.near_target, 'receive') as near_target_receive:
-                    with patch.object(self.far_target, 'receive') as far_target_receive:
-                        advance_time(0.45)
-                        assert not transmission_receive.called
-                        assert not source_agent_receive.called
-                        assert near_target_receive.called
-                        assert far_target_receive.called
-                        # FIXME how to assert near target was called first?
-
-    def test_advance_twice_reaching_each_target_in_turn(self):
-        advance_time(0.11)
-        with patch.object(self.transmission, 'receive') as transmission_receive:
-            with patch.object(self.source_agent, 'receive') as source_agent_receive:
-                with patch.object(self.near_target, 'receive') as near_target_receive:
-                    with patch.object(self.far_target, 'receive') as far_target_receive:
-                        advance_time(0.34)
-                        assert not transmission_receive.called
-                        assert not source_agent_receive.called
-                        assert not  near_target_receive.called
-                        assert far_target_receive.called
+    def test_advance_once_reaching_targets_in_order(self):
+        transmit(self.transmission)
+        reactions = []
+        self.near_target.react = lambda time, transmission: reactions.append((self.near_target.id, time))
+        self.far_target.react = lambda time, transmission: reactions.append((self.far_target.id, time))
+        advance_time(0.45)
+        assert reactions == [('near', approx(0.1)), ('far', approx(0.4))]
 
     def test_advance_once_reaching_near_target_at_double_speed(self):
         self.transmission.speed = 2.0
-        with patch.object(self.transmission, 'receive') as transmission_receive:
-            with patch.object(self.source_agent, 'receive') as source_agent_receive:
-                with patch.object(self.near_target, 'receive') as near_target_receive:
-                    with patch.object(self.far_target, 'receive') as far_target_receive:
-                        advance_time(0.055)
-                        assert not transmission_receive.called
-                        assert not source_agent_receive.called
-                        assert near_target_receive.called
-                        assert not far_target_receive.called
+        transmit(self.transmission)
+        with patch.object(self.near_target, 'react') as near_target_react:
+            with patch.object(self.far_target, 'react') as far_target_react:
+                advance_time(0.055)
+                assert near_target_react.called
+                assert not far_target_react.called
+
+    def test_agents_outside_spatial_boundary_are_not_reached(self):
+        outside = Agent('outside', 1.5)
+        add_agent(outside)
+        with patch.object(outside, 'receive') as outside_receive:
+            transmit(self.transmission)
+            assert not outside_receive.called
+
+class TestTransmissionInThreeDimensions(object):
+
+    def setup(self):
+        reset_simulation()
+        set_spatial_boundary((-10, -10, -10), (10, 10, 10))
+        self.source_agent = Agent('source', (0, 0, 0))
+        self.targets = [Agent('target-{}'.format(index), location) for index, location in enumerate([(3, 4, 0), (0, 0, -2), (6, 0, 8)])]
+        add_agent(self.source_agent)
+        for target in self.targets:
+            add_agent(target)
+        self.transmission = Transmission('transmission', self.source_agent, current_time())
+
+    def test_reception_time_is_euclidean_distance_over_speed(self):
+        assert [self.transmission.reception_time(target) for target in self.targets] == [5, 2, 10]
 
-    def test_transmission_removes_itself_from_simulation_after_reaching_boundary(self):
-        assert get_agent(self.transmission.id) is not None
-        advance_time(0.6)
-        with raises(KeyError):
-            get_agent(self.transmission.id)
+    def test_transmit_reaches_agents_within_boundary_box(self):
+        outside = Agent('outside', (20, 0, 0))
+        add_agent(outside)
+        reactions = []
+        for agent in self.targets + [outside]:
+            agent.react = (lambda agent: lambda time, transmission: reactions.append((agent.id, time)))(agent)
+        transmit(self.transmission)
+        advance_time(11)
+        assert reactions == [('target-1', 2), ('target-0', 5), ('target-2', 10)]
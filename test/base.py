@@ -1,5 +1,6 @@
 from pytest import raises
 from pytest import mark
+from pytest import approx
 from mock import patch
 
 from hashwars import *
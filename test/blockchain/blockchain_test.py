@@ -34,3 +34,200 @@ class TestNewBlockchain(object):
         assert self.blockchain.weight == old_weight
         assert self.blockchain.difficulty == old_difficulty
         assert block.height is None
+
+class TestBlockchainSharing(object):
+
+    def setup(self):
+        self.blockchain = new_blockchain()
+        self.genesis_block = self.blockchain.genesis_block
+
+    def _mine(self, blockchain, id, producer=None):
+        block = Block(id, blockchain.tip, blockchain.difficulty, producer=producer)
+        assert blockchain.add(block)
+        return block
+
+    def test_add_links_block_to_tip(self):
+        block = self._mine(self.blockchain, 'first')
+        assert self.blockchain.tip is block
+        assert block.height == 2
+        assert self.blockchain.height == 2
+        assert self.blockchain.weight == self.genesis_block.weight + block.weight
+        assert self.blockchain.heights == [self.genesis_block.id, 'first']
+        assert self.blockchain.blocks['first'] is block
+
+    def test_copy_shares_blocks_but_grows_independently(self):
+        self._mine(self.blockchain, 'first')
+        copy = self.blockchain.copy()
+        assert copy.tip is self.blockchain.tip
+        self._mine(copy, 'second')
+        assert copy.height == 3
+        assert self.blockchain.height == 2
+        assert 'second' not in self.blockchain.blocks
+
+    def test_merge_adopts_heavier_tip(self):
+        other = self.blockchain.copy()
+        self._mine(self.blockchain, 'mine')
+        self._mine(other, 'theirs-1')
+        block = self._mine(other, 'theirs-2')
+        assert self.blockchain.merge(other)
+        assert self.blockchain.tip is block
+        assert self.blockchain.heights == [self.genesis_block.id, 'theirs-1', 'theirs-2']
+
+    def test_merge_rejects_lighter_chain(self):
+        other = self.blockchain.copy()
+        block = self._mine(self.blockchain, 'mine')
+        assert not self.blockchain.merge(other)
+        assert self.blockchain.tip is block
+
+    def test_add_rejects_stale_block(self):
+        first = self._mine(self.blockchain, 'first')
+        self._mine(self.blockchain, 'second')
+        assert self.blockchain.contains(first)
+        assert not self.blockchain.add(Block('stale', first, self.blockchain.difficulty))
+        assert self.blockchain.height == 3
+
+    def test_weights_by_producer_are_counted_on_add(self):
+        self._mine(self.blockchain, 'a-1', producer='a')
+        self._mine(self.blockchain, 'b-1', producer='b')
+        self._mine(self.blockchain, 'a-2', producer='a')
+        assert self.blockchain.weight_produced_by('a') == 2 * self.blockchain.difficulty
+        assert self.blockchain.weight_produced_by('b') == self.blockchain.difficulty
+        assert self.blockchain.weight_produced_by('c') == 0
+
+    def test_weights_by_producer_follow_reorganization(self):
+        self._mine(self.blockchain, 'shared', producer='a')
+        other = self.blockchain.copy()
+        self._mine(self.blockchain, 'a-1', producer='a')
+        self._mine(other, 'b-1', producer='b')
+        self._mine(other, 'b-2', producer='b')
+        assert self.blockchain.merge(other)
+        assert self.blockchain.weight_produced_by('a') == self.blockchain.difficulty
+        assert self.blockchain.weight_produced_by('b') == 2 * self.blockchain.difficulty
+        assert other.weight_produced_by('a') == self.blockchain.difficulty
+
+    def test_shared_genesis_block_keeps_its_initial_difficulty(self):
+        assert new_blockchain(genesis_block=self.genesis_block).difficulty == self.blockchain.difficulty
+        with raises(AssertionError):
+            new_blockchain(genesis_block=self.genesis_block, initial_difficulty=1200)
+
+class TestBlockPropagation(object):
+
+    def setup(self):
+        self.blockchain = new_blockchain()
+        self.genesis_block = self.blockchain.genesis_block
+        self.other = self.blockchain.copy()
+
+    def _mine(self, blockchain, id, producer=None):
+        block = Block(id, blockchain.tip, blockchain.difficulty, producer=producer)
+        assert blockchain.add(block)
+        return block
+
+    def test_received_block_extends_tip(self):
+        block = self._mine(self.other, 'theirs', producer='b')
+        assert self.blockchain.receive_block(block)
+        assert self.blockchain.tip is block
+        assert self.blockchain.weight_produced_by('b') == block.weight
+        assert not self.blockchain.receive_block(block)
+
+    def test_orphan_connects_once_its_parent_arrives(self):
+        first = self._mine(self.other, 'theirs-1')
+        second = self._mine(self.other, 'theirs-2')
+        assert not self.blockchain.receive_block(second)
+        assert self.blockchain.orphans == {'theirs-1': [second]}
+        assert self.blockchain.tip is self.genesis_block
+        assert self.blockchain.receive_block(first)
+        assert self.blockchain.tip is second
+        assert self.blockchain.orphans == {}
+
+    def test_orphans_of_rejected_block_are_dropped(self):
+        light = Block('light', self.genesis_block, self.blockchain.difficulty / 2)
+        child = Block('child', light, self.blockchain.difficulty)
+        grandchild = Block('grandchild', child, self.blockchain.difficulty)
+        assert not self.blockchain.receive_block(grandchild)
+        assert not self.blockchain.receive_block(child)
+        assert not self.blockchain.receive_block(light)
+        assert self.blockchain.orphans == {}
+        assert self.blockchain.tip is self.genesis_block
+
+    def test_lighter_branch_is_known_but_not_adopted(self):
+        mine = self._mine(self.blockchain, 'mine-1')
+        self._mine(self.blockchain, 'mine-2')
+        theirs = self._mine(self.other, 'theirs-1')
+        assert not self.blockchain.receive_block(theirs)
+        assert self.blockchain.heights == [self.genesis_block.id, 'mine-1', 'mine-2']
+        assert 'theirs-1' in self.blockchain.known_block_ids
+        assert self.blockchain.receive_block(self._mine(self.other, 'theirs-2'))
+        assert self.blockchain.receive_block(self._mine(self.other, 'theirs-3'))
+        assert self.blockchain.heights == [self.genesis_block.id, 'theirs-1', 'theirs-2', 'theirs-3']
+        assert self.blockchain.weight_produced_by(None) == self.genesis_block.weight + 3 * theirs.weight
+
+    def test_block_and_chain_propagation_agree(self):
+        from simulations import miner_launch
+        results = {}
+        for propagation in (PROPAGATE_CHAIN, PROPAGATE_BLOCK):
+            with Simulation():
+                seed_random(5)
+                results[propagation] = miner_launch((3000, 2, ['--steps', '20', '--propagation', propagation]))
+        assert results[PROPAGATE_CHAIN] == results[PROPAGATE_BLOCK]
+
+class TestBlock(object):
+
+    def setup(self):
+        reset_simulation()
+
+    def test_new_ids_are_sequential_within_a_simulation(self):
+        assert [Block.new_id() for _ in range(3)] == [1, 2, 3]
+        with Simulation():
+            assert Block.new_id() == 1
+        assert Block.new_id() == 4
+        reset_simulation()
+        assert Block.new_id() == 1
+
+    def test_blocks_have_no_instance_dict(self):
+        block = new_genesis_block()
+        assert not hasattr(block, '__dict__')
+        with raises(AttributeError):
+            block.unknown_attribute = True
+
+class TestDifficultyRetargeting(object):
+
+    def setup(self):
+        self.genesis_block = Block('genesis', None, 600, height=1, time=0)
+        self.blockchain = new_blockchain(genesis_block=self.genesis_block, difficulty_readjustment_period=4, retarget=True)
+
+    def _mine(self, blockchain, times, id_prefix='block'):
+        for index, time in enumerate(times):
+            assert blockchain.add(Block('{}-{}'.format(id_prefix, index), blockchain.tip, blockchain.difficulty, time=time))
+
+    def test_difficulty_is_fixed_within_a_period(self):
+        self._mine(self.blockchain, [300, 600])
+        assert self.blockchain.difficulty == 600
+
+    def test_fast_blocks_raise_difficulty_at_end_of_period(self):
+        self._mine(self.blockchain, [300, 600, 900])
+        assert self.blockchain.height == 4
+        assert self.blockchain.difficulty == 1200
+        self._mine(self.blockchain, [1200, 1500, 1800, 2400])
+        assert self.blockchain.difficulty == 1800
+
+    def test_change_is_limited_by_max_factor(self):
+        self._mine(self.blockchain, [1, 2, 3])
+        assert self.blockchain.difficulty == 600 * 4
+
+    def test_difficulty_follows_reorganizations(self):
+        other = self.blockchain.copy()
+        self._mine(self.blockchain, [300, 600, 900])
+        self._mine(other, [3600, 7200, 10800, 14400], id_prefix='other')
+        assert other.difficulty == 600 / 4
+        assert self.blockchain.merge(other)
+        assert self.blockchain.difficulty == 600 / 4
+        assert self.blockchain.tip is other.tip
+
+    def test_retargeting_needs_genesis_block_time(self):
+        with raises(AssertionError):
+            new_blockchain(genesis_block=new_genesis_block(), difficulty_readjustment_period=4, retarget=True)
+
+    def test_fixed_difficulty_without_retargeting(self):
+        blockchain = new_blockchain(genesis_block=Block('genesis', None, 600, height=1, time=0), difficulty_readjustment_period=4)
+        self._mine(blockchain, [300, 600, 900])
+        assert blockchain.difficulty == 600
@@ -0,0 +1,75 @@
+from sys import modules
+from os import utime
+from os.path import exists
+from pickle import dumps
+
+from test.base import *
+
+def noisy_simulator(params):
+    distance, hashrate_ratio, argv = params
+    return (distance, hashrate_ratio, current_random().random())
+
+class TestResultCache(object):
+
+    def setup(self):
+        self.namespace = modules[__name__]
+
+    def test_stores_results_by_key(self, tmpdir):
+        cache = ResultCache(str(tmpdir))
+        key = cache.key(self.namespace, 'noisy_simulator', 1, 2, ['--flag'], None, 0)
+        assert cache.get(key) == (False, None)
+        cache.put(key, (1.0, 2.0, [3.0]))
+        assert cache.get(key) == (True, (1.0, 2.0, [3.0]))
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_corrupt_entries_are_misses(self, tmpdir):
+        cache = ResultCache(str(tmpdir))
+        keys = [cache.key(self.namespace, 'noisy_simulator', 1, 2, [], None, replica) for replica in range(3)]
+        for key, contents in zip(keys, [b'garbage', b'', dumps((1.0, 2.0, 3.0))[:-3]]):
+            cache.put(key, None)
+            with open(cache.path(key), 'wb') as entry_file:
+                entry_file.write(contents)
+        for key in keys:
+            assert cache.get(key) == (False, None)
+            assert not exists(cache.path(key))
+        assert cache.misses == 3
+
+    def test_keys_depend_on_every_parameter(self, tmpdir):
+        cache = ResultCache(str(tmpdir))
+        arguments = ['noisy_simulator', 1.0, 2.0, ['--flag'], None, 0]
+        key = cache.key(self.namespace, *arguments)
+        assert cache.key(self.namespace, 'noisy_simulator', 1, 2, ['--flag'], None, 0) == key
+        for index, value in enumerate(['other_simulator', 1.5, 2.5, ['--other-flag'], 7, 1]):
+            changed_arguments = list(arguments)
+            changed_arguments[index] = value
+            assert cache.key(self.namespace, *changed_arguments) != key
+
+    def test_prune_evicts_least_recently_used(self, tmpdir):
+        cache = ResultCache(str(tmpdir))
+        keys = [cache.key(self.namespace, 'noisy_simulator', 1, 2, [], None, replica) for replica in range(3)]
+        for age, key in zip([30, 20, 10], keys):
+            cache.put(key, 'x' * 1000)
+            utime(cache.path(key), (0, 1000000 - age))
+        cache.get(keys[0])
+        size = cache.size()
+        assert cache.prune(size - 1) == 1
+        assert [cache.get(key)[0] for key in keys] == [True, False, True]
+        assert cache.clear() == 2
+        assert cache.size() == 0
+
+    def test_sweeps_reuse_cached_runs(self, tmpdir):
+        cache = ResultCache(str(tmpdir))
+        distances, hashrate_ratios, results, seed = many_static_binary_simulations(self.namespace, 'noisy_simulator', 2, [1.0, 2.0], [1.0], [], cache=cache, seed=7)
+        distances, hashrate_ratios, more_results, seed = many_static_binary_simulations(self.namespace, 'noisy_simulator', 3, [1.0, 2.0, 3.0], [1.0], [], cache=cache, seed=7)
+        assert more_results[:2, :, :2].tolist() == results.tolist()
+        assert cache.hits == 4
+        assert len(cache.entries()) == 9
+
+    def test_unseeded_runs_bypass_the_cache(self, tmpdir):
+        cache = ResultCache(str(tmpdir))
+        distances, hashrate_ratios, results, seed = many_static_binary_simulations(self.namespace, 'noisy_simulator', 2, [1.0, 2.0], [1.0], [], cache=cache)
+        distances, hashrate_ratios, more_results, seed = many_static_binary_simulations(self.namespace, 'noisy_simulator', 2, [1.0, 2.0], [1.0], [], cache=cache)
+        assert more_results.tolist() != results.tolist()
+        single_static_binary_simulation(self.namespace, 'noisy_simulator', 1.0, 1.0, [], cache=cache)
+        assert (cache.hits, cache.misses) == (0, 0)
+        assert cache.entries() == []
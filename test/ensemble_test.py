@@ -0,0 +1,73 @@
+from statistics import mean, stdev
+
+from numpy import array, arange, full, zeros, inf
+from numpy.random import default_rng
+
+from test.base import *
+from hashwars.ensemble import launch_ensemble, _TransmissionQueues, MINORITY, MAJORITY
+
+import simulations
+
+_ARGV = ['--min_time', '3600', '--time_distance_ratio', '1']
+
+class TestLaunchEnsemble(object):
+
+    def test_weights_are_multiples_of_block_weight(self):
+        weights = launch_ensemble(100, 2, 50, 3600, generator=default_rng(1))
+        assert weights.shape == (50, 2, 2)
+        assert ((weights % 600) == 0).all()
+        assert (weights.sum(axis=(1, 2)) > 0).all()
+
+    def test_majority_mines_nothing_before_launch_reaches_it(self):
+        weights = launch_ensemble(5000, 2, 50, 4000, mode='blockchain', generator=default_rng(1))
+        assert (weights[:, :, MAJORITY] == 0).all()
+
+    def test_replicated_simulator_returns_one_result_per_replica(self):
+        results = simulations.miner_launch_ensemble_minority_weight_fraction((100, 2, _ARGV), 7)
+        assert len(results) == 7
+        assert all(result[:2] == (100.0, 2.0) for result in results)
+
+    @mark.parametrize('mode', ['miner', 'blockchain'])
+    def test_statistically_equivalent_to_object_engine(self, mode):
+        params = (100, 1.5, _ARGV)
+        with Simulation():
+            seed_random(1)
+            object_fractions = [getattr(simulations, '{}_launch_minority_weight_fraction'.format(mode))(params)[2] for run in range(300)]
+            ensemble_fractions = [result[2] for result in getattr(simulations, '{}_launch_ensemble_minority_weight_fraction'.format(mode))(params, 20000)]
+        standard_error = ((stdev(object_fractions) ** 2 / len(object_fractions)) + (stdev(ensemble_fractions) ** 2 / len(ensemble_fractions))) ** 0.5
+        assert abs(mean(object_fractions) - mean(ensemble_fractions)) < (4 * standard_error)
+
+class TestTransmissionQueues(object):
+
+    def test_queues_are_first_in_first_out_across_growth(self):
+        queues = _TransmissionQueues(2, capacity=2)
+        replicas = array([0, 1])
+        for time in range(5):
+            queues.push(MINORITY, replicas, array([time, 10 + time]), array([[time, 0], [10 + time, 0]]))
+        assert queues.capacity == 8
+        assert queues.next_times(MINORITY).tolist() == [0, 10]
+        assert queues.pop(MINORITY, replicas)[:, 0].tolist() == [0, 10]
+        assert queues.pop(MINORITY, array([1]))[:, 0].tolist() == [11]
+        assert queues.next_times(MINORITY).tolist() == [1, 12]
+        assert queues.next_times(MAJORITY).tolist() == [inf, inf]
+
+    def test_capacity_is_bounded_by_transmissions_in_flight(self):
+        queues = _TransmissionQueues(3, capacity=4)
+        replicas = arange(3)
+        for time in range(10000):
+            queues.push(MAJORITY, replicas, full(3, time + 3.0), zeros((3, 2)))
+            if time >= 3:
+                queues.pop(MAJORITY, replicas)
+        assert queues.capacity == 4
+        assert queues.next_times(MAJORITY).tolist() == [10000.0] * 3
+
+    def test_long_launches_keep_queues_small(self):
+        capacities = []
+        class RecordingQueues(_TransmissionQueues):
+            def push(self, *args):
+                _TransmissionQueues.push(self, *args)
+                capacities.append(self.capacity)
+        with patch('hashwars.ensemble._TransmissionQueues', RecordingQueues):
+            launch_ensemble(720, 4, 20, 7 * 86400, generator=default_rng(1))
+        assert len(capacities) > 1000
+        assert max(capacities) <= 32
@@ -0,0 +1,23 @@
+from sys import executable
+from subprocess import run
+
+from test.base import *
+
+def _modules_loaded_by(code):
+    return run([executable, '-c', "{}; import sys; print(' '.join(sys.modules))".format(code)], capture_output=True, text=True, check=True).stdout.split()
+
+class TestLazyImports(object):
+
+    def test_simulations_load_without_matplotlib_or_numpy(self):
+        modules = _modules_loaded_by("import hashwars, simulations")
+        assert 'matplotlib' not in modules
+        assert 'numpy' not in modules
+
+    def test_plotting_names_load_on_first_use(self):
+        modules = _modules_loaded_by("from hashwars import write_plot, plot; assert callable(plot)")
+        assert 'matplotlib' in modules
+
+    def test_unknown_names_raise_attribute_error(self):
+        import hashwars
+        with raises(AttributeError):
+            hashwars.no_such_name
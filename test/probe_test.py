@@ -0,0 +1,130 @@
+from test.base import *
+from test.factories import new_blockchain
+
+from statistics import mean, variance
+
+class TestTimeSeries(object):
+
+    def test_records_only_changes(self):
+        series = TimeSeries()
+        for time, value in [(1, 0.0), (2, 5.0), (3, 5.0), (4, 7.0)]:
+            series.record(time, value)
+        assert series.times == [0, 2, 4]
+        assert series.values == [0, 5, 7]
+        assert series.sample([0.5, 2, 3.9, 10]) == [0, 5, 5, 7]
+
+    def test_decimation_keeps_last_change_in_each_interval(self):
+        series = TimeSeries(decimation=10)
+        for time, value in [(1, 1), (3, 2), (9, 3), (12, 4), (25, 5), (27, 4)]:
+            series.record(time, value)
+        assert series.times == [0, 9, 12]
+        assert series.values == [0, 3, 4]
+
+    def test_decimation_drops_changes_undone_within_an_interval(self):
+        series = TimeSeries(decimation=10)
+        series.record(12, 1)
+        series.record(15, 0)
+        assert series.times == [0]
+        assert series.values == [0]
+
+class TestStatistics(object):
+
+    def test_matches_batch_statistics(self):
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        statistics = Statistics()
+        for value in values:
+            statistics.add(value)
+        assert statistics.count == 8
+        assert statistics.mean == approx(mean(values))
+        assert statistics.variance == approx(variance(values))
+        assert (statistics.minimum, statistics.maximum) == (1, 9)
+
+class TestProbes(object):
+
+    def setup(self):
+        reset_simulation()
+        self.blockchain = new_blockchain()
+        self.other = self.blockchain.copy()
+
+    def _mine(self, blockchain, id, producer):
+        assert blockchain.add(Block(id, blockchain.tip, blockchain.difficulty, producer=producer))
+
+    def test_weight_probe_follows_blocks_and_reorganizations(self):
+        probe = WeightProbe(self.blockchain, 'a')
+        advance_time(1)
+        self._mine(self.blockchain, 'a-1', 'a')
+        self._mine(self.other, 'b-1', 'b')
+        self._mine(self.other, 'b-2', 'b')
+        assert probe.series.values == [0, 600]
+        advance_time(1)
+        self.blockchain.merge(self.other)
+        assert probe.series.times == [0, 1, 2]
+        assert probe.series.values == [0, 600, 0]
+
+    def test_changes_at_the_same_time_collapse(self):
+        probe = WeightProbe(self.blockchain, 'a')
+        advance_time(1)
+        self._mine(self.blockchain, 'a-1', 'a')
+        self._mine(self.blockchain, 'a-2', 'a')
+        assert probe.series.times == [0, 1]
+        assert probe.series.values == [0, 1200]
+
+    def test_reorganization_probe_measures_depth(self):
+        probe = ReorganizationProbe(self.blockchain)
+        self._mine(self.blockchain, 'a-1', 'a')
+        self._mine(self.other, 'b-1', 'b')
+        self._mine(self.other, 'b-2', 'b')
+        self.blockchain.merge(self.other)
+        self._mine(self.other, 'b-3', 'b')
+        self.blockchain.merge(self.other)
+        assert probe.depths.count == 1
+        assert probe.depths.mean == 1
+
+    def test_reception_probe_measures_latency(self):
+        source, target = Agent('source', 0), Agent('target', 0.5)
+        add_agent(source)
+        add_agent(target)
+        probe = ReceptionProbe(target)
+        transmit(Transmission('transmission', source, 0))
+        advance_time(1)
+        assert probe.latencies.count == 1
+        assert probe.latencies.mean == approx(0.5)
+
+    def test_detached_probes_and_reset_stop_observing(self):
+        probe = WeightProbe(self.blockchain, 'a')
+        probe.detach()
+        self._mine(self.blockchain, 'a-1', 'a')
+        assert probe.series.values == [0]
+        WeightProbe(self.blockchain, 'a')
+        reset_simulation()
+        assert current_simulation().subscribers == {}
+
+    def test_probes_match_polling(self):
+        from simulations import Miners
+        with Simulation():
+            seed_random(7)
+            set_spatial_boundary(-1, 1001)
+            genesis_block = Block('genesis', None, 600, height=1, time=0)
+            near = Miners('near', 0, Blockchain('near', genesis_block), propagation=PROPAGATE_BLOCK)
+            far = Miners('far', 1000, Blockchain('far', genesis_block), initial_hashrate=2, propagation=PROPAGATE_BLOCK)
+            add_agent(near)
+            add_agent(far)
+            probes = [WeightProbe(miners.blockchain, producer.id) for miners in (near, far) for producer in (near, far)]
+            for step in range(100):
+                advance_time(317)
+                polled = [miners.blockchain.weight_produced_by(producer.id) for miners in (near, far) for producer in (near, far)]
+                assert [probe.series.value_at(current_time()) for probe in probes] == polled
+
+class TestEventSampling(object):
+
+    def test_launch_reports_every_change(self):
+        from simulations import miner_launch
+        with Simulation():
+            seed_random(8)
+            distance, hashrate_ratio, times, *weights = miner_launch((1000, 2, ['--sampling', 'events', '--min_time', '50000']))
+        assert times == sorted(set(times))
+        assert times[-1] == 50000
+        assert all(len(series) == len(times) for series in weights)
+        # Every reported time (but the last) is when some weight changed.
+        changes = set(index for series in weights for index in range(1, len(series)) if series[index] != series[index - 1])
+        assert changes | {len(times) - 1, 0} >= set(range(len(times)))
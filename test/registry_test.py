@@ -0,0 +1,57 @@
+from test.base import *
+
+from random import Random
+
+from hashwars.registry import AgentRegistry
+
+class TestAgentRegistry(object):
+
+    def setup(self):
+        self.registry = AgentRegistry()
+        self.agents = [Agent('agent-{}'.format(index), location) for index, location in enumerate([0.5, 0.1, 0.9, 0.5, 0.3])]
+        for agent in self.agents:
+            self.registry.add(agent)
+
+    def test_located_in_returns_agents_in_closed_interval_sorted_by_location(self):
+        assert [agent.location for agent in self.registry.located_in(0.3, 0.9)] == [0.3, 0.5, 0.5, 0.9]
+        assert self.registry.located_in(0.6, 0.8) == []
+
+    def test_remove_drops_agent_from_location_index(self):
+        self.registry.remove(self.agents[0].id)
+        assert self.agents[0].id not in self.registry
+        assert self.registry.located_in(0.5, 0.5) == [self.agents[3]]
+        assert len(self.registry) == 4
+
+    def test_remove_missing_agent_raises(self):
+        with raises(KeyError):
+            self.registry.remove('missing')
+
+    def test_stepped_agents_are_ordered_by_priority(self):
+        low = Agent('low', 0)
+        high = Agent('high', 0)
+        low.stepped = high.stepped = True
+        high.priority = 2
+        self.registry.add(low)
+        self.registry.add(high)
+        assert self.registry.stepped_agents() == [high, low]
+        self.registry.remove('high')
+        assert self.registry.stepped_agents() == [low]
+
+class TestVectorLocations(object):
+
+    def setup(self):
+        generator = Random(1)
+        self.registry = AgentRegistry()
+        self.agents = [Agent('agent-{}'.format(index), (generator.random(), generator.random(), generator.random())) for index in range(500)]
+        for agent in self.agents:
+            self.registry.add(agent)
+
+    def test_located_in_box_matches_brute_force(self):
+        for lower, upper in [((0.2, 0.2, 0.2), (0.5, 0.9, 0.4)), ((0.33, 0.05, 0.61), (0.34, 0.95, 0.99)), ((-1, -1, -1), (2, 2, 2))]:
+            expected = [agent for agent in self.agents if all(low <= coordinate <= high for low, coordinate, high in zip(lower, agent.location, upper))]
+            assert set(agent.id for agent in self.registry.located_in(lower, upper, sort=False)) == set(agent.id for agent in expected)
+            assert self.registry.located_in(lower, upper) == sorted(expected, key=lambda agent: agent.location)
+
+    def test_remove_drops_agent_from_box(self):
+        self.registry.remove('agent-0')
+        assert len(self.registry.located_in((0, 0, 0), (1, 1, 1))) == 499
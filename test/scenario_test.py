@@ -0,0 +1,80 @@
+from test.base import *
+
+from os.path import dirname, join
+
+SCENARIOS_DIR = join(dirname(dirname(__file__)), 'scenarios')
+
+class TestReadScenario(object):
+
+    def test_reads_miners_ignoring_comments_and_blank_lines(self, tmpdir):
+        path = tmpdir.join('pair.txt')
+        path.write("# ID LOCATION HASHRATE\n\nearth 0 3  # home\nmars\t720\t1\n")
+        scenario = read_scenario(str(path))
+        assert scenario.name == 'pair'
+        assert scenario.miners == [ScenarioMiner('earth', 0, 3), ScenarioMiner('mars', 720, 1)]
+
+    def test_malformed_line_raises(self, tmpdir):
+        path = tmpdir.join('broken.txt')
+        path.write("earth 0\n")
+        with raises(ValueError):
+            read_scenario(str(path))
+
+    def test_bundled_scenarios_load(self):
+        scenario = read_scenario(join(SCENARIOS_DIR, 'earth_moon_mars.txt'))
+        assert scenario.ids == ['earth', 'moon', 'l1', 'mars']
+
+    def test_scaled_multiplies_locations(self):
+        scenario = Scenario('pair', [ScenarioMiner('a', 0, 1), ScenarioMiner('b', 10, 1)])
+        assert [miner.location for miner in scenario.scaled(3).miners] == [0, 30]
+        assert [miner.location for miner in scenario.miners] == [0, 10]
+
+class TestRunScenario(object):
+
+    def setup(self):
+        self.scenario = Scenario('trio', [ScenarioMiner('a', 0, 2), ScenarioMiner('b', 5, 1), ScenarioMiner('c', 2000, 1)])
+
+    def test_shares_sum_to_one(self):
+        shares = run_scenario(self.scenario, 100 * 600, seed=1)
+        assert len(shares) == 3
+        assert sum(shares) == approx(1)
+        assert shares[0] > shares[2]
+
+    def test_seeded_runs_are_reproducible(self):
+        assert run_scenario(self.scenario, 50 * 600, seed=2) == run_scenario(self.scenario, 50 * 600, seed=2)
+
+    def test_runs_in_a_simulation_of_its_own(self):
+        run_scenario(self.scenario, 600, seed=3)
+        assert current_time() == 0
+        assert 'a' not in all_agent_ids()
+
+    def test_distant_minority_loses_its_share(self):
+        scenario = Scenario('pair', [ScenarioMiner('majority', 0, 4), ScenarioMiner('minority', 6000, 1)])
+        majority, minority = run_scenario(scenario, 1000 * 600, seed=4)
+        assert minority < 0.2
+
+class TestScenarioSimulations(object):
+
+    def test_collates_shares_by_scale_and_replica(self):
+        scenario = Scenario('pair', [ScenarioMiner('a', 0, 1), ScenarioMiner('b', 60, 1)])
+        ids, scales, shares, seed = scenario_simulations(scenario, 20 * 600, 3, distance_scales=[1, 10], seed=5)
+        assert ids == ['a', 'b']
+        assert scales == [1, 10]
+        assert shares.shape == (2, 3, 2)
+        assert shares.sum(axis=2) == approx(1)
+        assert (shares == scenario_simulations(scenario, 20 * 600, 3, distance_scales=[1, 10], seed=5)[2]).all()
+
+class TestScenarioInSpace(object):
+
+    def test_reads_two_and_three_dimensional_locations(self, tmpdir):
+        path = tmpdir.join('plane.txt')
+        path.write("a 0 0 1\nb 300 400 1\n")
+        scenario = read_scenario(str(path))
+        assert scenario.dimensions == 2
+        assert scenario.miners[1].location == (300, 400)
+        assert scenario.scaled(2).miners[1].location == (600, 800)
+        assert scenario.spatial_boundary() == ((-1, -1), (301, 401))
+
+    def test_runs_in_three_dimensions(self):
+        scenario = Scenario('constellation', [ScenarioMiner('miner-{}'.format(index), (index * 10.0, (index % 3) * 20.0, 5.0), 1) for index in range(8)])
+        shares = run_scenario(scenario, 50 * 600, seed=6)
+        assert sum(shares) == approx(1)
@@ -0,0 +1,145 @@
+from sys import modules
+
+from numpy import isnan
+from numpy.random import default_rng
+
+from test.base import *
+from hashwars.simulate import _batches, _Grid, _run_replicas
+
+def product_simulator(params):
+    distance, hashrate_ratio, argv = params
+    return (distance, hashrate_ratio, distance * hashrate_ratio)
+
+def noisy_simulator(params):
+    distance, hashrate_ratio, argv = params
+    return (distance, hashrate_ratio, (current_random().random() if distance > 1 else 0.5))
+
+@replicated
+def replicated_noisy_simulator(params, replicas):
+    distance, hashrate_ratio, argv = params
+    return [(distance, hashrate_ratio, current_random().random()) for replica in range(replicas)]
+
+class TestBatches(object):
+
+    def test_batches_have_at_most_batch_size_runs(self):
+        batches = _batches([(0, 0, 1, 1, 0, 5), (1, 0, 2, 1, 0, 2), (2, 0, 3, 1, 1, 4)], 3)
+        assert batches == [
+            [(0, 0, 1, 1, 0, 3)],
+            [(0, 0, 1, 1, 3, 2), (1, 0, 2, 1, 0, 1)],
+            [(1, 0, 2, 1, 1, 1), (2, 0, 3, 1, 1, 2)],
+            [(2, 0, 3, 1, 3, 2)],
+        ]
+
+class TestManyStaticBinarySimulations(object):
+
+    def test_collates_results_by_distance_and_ratio(self):
+        distances, hashrate_ratios, results, seed = many_static_binary_simulations(modules[__name__], 'product_simulator', 3, [1.0, 2.0], [3.0, 4.0], [], batch_size=2)
+        assert results.shape == (2, 2, 3)
+        assert results.tolist() == [[[3.0] * 3, [4.0] * 3], [[6.0] * 3, [8.0] * 3]]
+
+    def test_resumes_from_checkpoint(self, tmpdir):
+        path = str(tmpdir.join('checkpoint.dat'))
+        many_static_binary_simulations(modules[__name__], 'product_simulator', 1, [1.0, 2.0], [3.0], [], checkpoint_path=path)
+        assert len(read_appended_results(path)) == 1 + 2
+        distances, hashrate_ratios, results, seed = many_static_binary_simulations(modules[__name__], 'product_simulator', 2, [1.0, 2.0], [3.0], [], checkpoint_path=path)
+        assert len(read_appended_results(path)) == 1 + 4
+        assert results.tolist() == [[[3.0, 3.0]], [[6.0, 6.0]]]
+
+    def test_resumes_missing_replicas_only(self, tmpdir):
+        path = str(tmpdir.join('checkpoint.dat'))
+        expected = many_static_binary_simulations(modules[__name__], 'noisy_simulator', 4, [2.0], [1.0], [], checkpoint_path=path, seed=5)[2]
+        header, *runs = read_appended_results(path)
+        partial_path = str(tmpdir.join('partial.dat'))
+        with open(partial_path, 'wb') as partial_file:
+            append_result(header, partial_file)
+            for run in runs:
+                if run[2] in (0, 2):
+                    append_result(run, partial_file)
+        distances, hashrate_ratios, results, seed = many_static_binary_simulations(modules[__name__], 'noisy_simulator', 4, [2.0], [1.0], [], checkpoint_path=partial_path, seed=5)
+        assert results.tolist() == expected.tolist()
+        assert sorted(run[2] for run in read_appended_results(partial_path)[1:]) == [0, 1, 2, 3]
+
+    def test_refuses_checkpoint_of_another_sweep(self, tmpdir):
+        path = str(tmpdir.join('checkpoint.dat'))
+        many_static_binary_simulations(modules[__name__], 'product_simulator', 1, [1.0], [3.0], ['--a'], checkpoint_path=path)
+        with raises(ValueError):
+            many_static_binary_simulations(modules[__name__], 'product_simulator', 1, [1.0], [3.0], ['--b'], checkpoint_path=path)
+
+def step_simulator(params):
+    distance, hashrate_ratio, argv = params
+    return (distance, hashrate_ratio, (1.0 if distance > 4.5 else 0.0))
+
+class TestAdaptiveStaticBinarySimulations(object):
+
+    def test_refines_cells_around_steps(self, tmpdir):
+        path = str(tmpdir.join('checkpoint.dat'))
+        distances = [float(distance) for distance in range(17)]
+        distances, hashrate_ratios, results, seed = adaptive_static_binary_simulations(modules[__name__], 'step_simulator', 2, distances, [1.0], [], 100, checkpoint_path=path)
+        sampled_distances = sorted(set(distance for distance, hashrate_ratio, replica, result in read_appended_results(path)[1:]))
+        assert sampled_distances == [0.0, 4.0, 5.0, 6.0, 8.0, 12.0, 16.0]
+        assert results[:, 0, 0].tolist() == ([0.0] * 5) + ([1.0] * 12)
+
+    def test_interpolates_between_corners(self):
+        distances, hashrate_ratios, results, seed = adaptive_static_binary_simulations(modules[__name__], 'product_simulator', 1, [1.0, 2.0, 3.0, 5.0], [1.0, 2.0], [], 4, stride=3)
+        assert results[:, :, 0].tolist() == [[1.0, 2.0], [2.0, 4.0], [3.0, 6.0], [5.0, 10.0]]
+
+    def test_interpolation_keeps_spread_of_runs(self):
+        grid = _Grid([0.0, 1.0, 2.0], [0.0, 1.0, 2.0], 2000)
+        generator = default_rng(1)
+        for distance_index in (0, 2):
+            for hashrate_ratio_index in (0, 2):
+                for replica, result in enumerate(generator.uniform(size=2000) + distance_index):
+                    grid.collate(distance_index, hashrate_ratio_index, (None, None, result), replica)
+        grid.interpolate((0, 2, 0, 2))
+        center = grid.results[1, 1]
+        assert center.mean() == approx(grid.results[[0, 2]][:, [0, 2]].mean())
+        assert center.std() == approx(grid.results[[0, 2]][:, [0, 2]].std(axis=2).mean())
+        assert center.std() == approx(12 ** -0.5, rel=0.05)
+
+    def test_stops_at_budget(self):
+        distances = [float(distance) for distance in range(17)]
+        distances, hashrate_ratios, results, seed = adaptive_static_binary_simulations(modules[__name__], 'step_simulator', 2, distances, [1.0], [], 10, interpolate=False)
+        assert (~isnan(results[:, 0, 0])).sum() == 5
+
+class TestSequentialStaticBinarySimulations(object):
+
+    def test_runs_until_confidence_interval_is_narrow(self):
+        distances, hashrate_ratios, results, counts, seed = sequential_static_binary_simulations(modules[__name__], 'noisy_simulator', [1.0, 2.0], [1.0], [], ci_width=0.1, min_count=20)
+        assert counts[0, 0] == 20
+        assert 60 < counts[1, 0] < 400
+        assert results.shape == (2, 1, counts[1, 0])
+        assert (~isnan(results)).sum(axis=2).tolist() == counts.tolist()
+        assert 1.96 * results[1, 0].std(ddof=1) / (counts[1, 0] ** 0.5) <= 0.05
+
+    def test_stops_at_max_count(self):
+        distances, hashrate_ratios, results, counts, seed = sequential_static_binary_simulations(modules[__name__], 'noisy_simulator', [2.0], [1.0], [], relative_error=0.001, min_count=5, max_count=30)
+        assert counts.tolist() == [[30]]
+
+class TestSeeds(object):
+
+    def test_seeded_sweeps_are_reproducible(self):
+        first = many_static_binary_simulations(modules[__name__], 'noisy_simulator', 3, [2.0, 3.0], [1.0], [], seed=7, batch_size=1)
+        second = many_static_binary_simulations(modules[__name__], 'noisy_simulator', 3, [2.0, 3.0], [1.0], [], seed=7, batch_size=2)
+        other = many_static_binary_simulations(modules[__name__], 'noisy_simulator', 3, [2.0, 3.0], [1.0], [], seed=8)
+        assert first[3] == 7
+        assert first[2].tolist() == second[2].tolist()
+        assert first[2].tolist() != other[2].tolist()
+        assert len(set(first[2].flatten().tolist())) == 6
+
+    def test_replicated_runs_do_not_depend_on_batches(self):
+        params = (2.0, 1.0, [])
+        whole = _run_replicas(replicated_noisy_simulator, params, 7, 0, 600)
+        pieces = [_run_replicas(replicated_noisy_simulator, params, 7, first, replicas) for first, replicas in [(0, 3), (3, 300), (303, 297)]]
+        assert [result for piece in pieces for result in piece] == whole
+        assert len(set(whole)) == 600
+        first = many_static_binary_simulations(modules[__name__], 'replicated_noisy_simulator', 5, [2.0], [1.0], [], seed=7, batch_size=1)
+        second = many_static_binary_simulations(modules[__name__], 'replicated_noisy_simulator', 5, [2.0], [1.0], [], seed=7, batch_size=3)
+        assert first[2].tolist() == second[2].tolist()
+
+    def test_seeded_launch_is_reproducible(self):
+        import simulations
+        argv = ['--min_time', '3600', '--time_distance_ratio', '1']
+        with Simulation():
+            first = single_static_binary_simulation(simulations, 'miner_launch', 100, 2, argv, seed=3)
+            second = single_static_binary_simulation(simulations, 'miner_launch', 100, 2, argv, seed=3)
+        assert first == second
@@ -0,0 +1,177 @@
+from os import environ
+from subprocess import run
+from sys import executable
+
+from test.base import *
+
+from hashwars.agent.delayed import DelayedAgent
+from hashwars.agent.periodic import PeriodicAgent
+
+class TestEventScheduling(object):
+
+    def setup(self):
+        reset_simulation()
+
+    def test_delayed_agent_acts_once_at_its_time(self):
+        agent = DelayedAgent('delayed', 0, 2.5)
+        add_agent(agent)
+        assert next_event_time() == 2.5
+        with patch.object(agent, 'act') as agent_act:
+            advance_time(2)
+            assert not agent_act.called
+            advance_time(1)
+            agent_act.assert_called_once_with(2.5)
+            advance_time(10)
+            assert agent_act.call_count == 1
+        assert next_event_time() is None
+
+    def test_periodic_agent_acts_every_period(self):
+        agent = PeriodicAgent('periodic', 0, 1, period=2)
+        add_agent(agent)
+        with patch.object(agent, 'act') as agent_act:
+            advance_time(6)
+            assert [call[0][0] for call in agent_act.call_args_list] == [1, 3, 5]
+
+    def test_inactive_agent_does_not_act(self):
+        agent = PoissonAgent('poisson', 0, active=False)
+        add_agent(agent)
+        assert next_event_time() is None
+
+    def test_poisson_agent_acts_at_mean_rate(self):
+        agent = PoissonAgent('poisson', 0)
+        add_agent(agent)
+        with patch.object(agent, 'act') as agent_act:
+            advance_time(2000)
+            assert 1800 < agent_act.call_count < 2200
+
+    def test_events_are_processed_in_time_order(self):
+        times = []
+        first = DelayedAgent('first', 0, 0.3)
+        second = DelayedAgent('second', 0, 0.2)
+        first.act = lambda time: times.append(current_time())
+        second.act = lambda time: times.append(current_time())
+        add_agent(first)
+        add_agent(second)
+        advance_time(1)
+        assert times == [0.2, 0.3]
+        assert current_time() == 1
+
+    def test_reaction_is_scheduled_at_reception_time(self):
+        source = Agent('source', 0)
+        target = Agent('target', 0.5)
+        add_agent(source)
+        add_agent(target)
+        transmission = Transmission('transmission', source, current_time())
+        transmit(transmission)
+        with patch.object(target, 'react') as target_react:
+            advance_time(0.4)
+            assert not target_react.called
+            advance_time(0.2)
+            target_react.assert_called_once_with(0.5, transmission)
+
+    def test_stepped_agent_reacts_once_at_reception_time(self):
+        source = Agent('source', 0)
+        target = Agent('target', 0.5)
+        target.stepped = True
+        add_agent(source)
+        add_agent(target)
+        transmission = Transmission('transmission', source, current_time())
+        transmit(transmission)
+        with patch.object(target, 'react') as target_react:
+            advance_time(0.4)
+            assert not target_react.called
+            advance_time(0.2)
+            target_react.assert_called_once_with(0.5, transmission)
+            advance_time(1)
+            assert target_react.call_count == 1
+
+class TestLog(object):
+
+    def setup(self):
+        reset_simulation()
+
+    def teardown(self):
+        configure_log(level=LOG_WARNING, buffer_size=10000)
+        reset_log()
+
+    def test_messages_below_level_are_not_formatted(self):
+        configure_log(level=LOG_INFO)
+        log("NOT FORMATTED {:d}", 'not-an-integer')
+        assert log_records() == []
+        log("FORMATTED", level=LOG_INFO)
+        assert len(log_records()) == 1
+
+    def test_messages_at_level_are_recorded(self):
+        configure_log(level='debug')
+        log("AGENT {} ADDED", 'agent')
+        assert log_records() == [(current_time(), LOG_DEBUG, "AGENT agent ADDED")]
+
+    def test_buffer_is_bounded(self):
+        configure_log(level=LOG_DEBUG, buffer_size=3)
+        for index in range(10):
+            log("MESSAGE {}", index)
+        assert [record[2] for record in log_records()] == ["MESSAGE 7", "MESSAGE 8", "MESSAGE 9"]
+
+    def test_log_file_is_opened_on_first_write(self, tmpdir):
+        path = tmpdir.join('hashwars.log')
+        code = "from hashwars import *; {}"
+        environment = dict(environ, HASHWARS_LOG_FILE=str(path))
+        run([executable, '-c', code.format("reset_simulation()")], env=environment, check=True)
+        assert not path.exists()
+        run([executable, '-c', code.format("log('WARNED', level=LOG_WARNING)")], env=environment, check=True)
+        assert path.read() == "0.0\tWARNED\n"
+
+class TestSimulationContext(object):
+
+    def setup(self):
+        reset_simulation()
+
+    def test_entered_simulation_is_current(self):
+        default = current_simulation()
+        with Simulation() as simulation:
+            assert current_simulation() is simulation
+            add_agent(Agent('agent', 0))
+            advance_time(1)
+            assert current_time() == 1
+        assert current_simulation() is default
+        assert current_time() == 0
+        assert 'agent' not in all_agent_ids()
+
+    def test_reset_restores_one_dimensional_space(self):
+        set_spatial_boundary((-10, -10), (10, 10))
+        reset_simulation()
+        assert get_spatial_boundary() == [0, 1]
+        source, target = Agent('source', 0), Agent('target', 0.5)
+        add_agent(source)
+        add_agent(target)
+        with patch.object(target, 'receive') as target_receive:
+            transmit(Transmission('transmission', source, current_time()))
+            assert target_receive.call_args[0][0] == approx(0.5)
+
+    def test_simulations_can_be_interleaved(self):
+        first, second = Simulation(), Simulation()
+        for simulation, act_at in [(first, 1), (second, 2)]:
+            with simulation:
+                add_agent(DelayedAgent('delayed', 0, act_at))
+        with first:
+            advance_time(1.5)
+        with second:
+            assert next_event_time() == 2
+            advance_time(0.5)
+        assert first.next_event_time() is None
+        assert first.time == 1.5
+        assert second.time == 0.5
+
+    def test_simulations_run_in_threads(self):
+        from threading import Thread
+        times = {}
+        def run(index):
+            with Simulation():
+                add_agent(PoissonAgent('poisson', 0))
+                for step in range(100):
+                    advance_time(index + 1)
+                times[index] = current_time()
+        threads = [Thread(target=run, args=(index,)) for index in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        assert times == {0: 100, 1: 200, 2: 300, 3: 400}
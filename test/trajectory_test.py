@@ -0,0 +1,94 @@
+from test.base import *
+
+from math import dist
+from random import Random
+
+class TestTrajectories(object):
+
+    def setup(self):
+        self.orbits = [circular_orbit(radius, period, phase=phase) for radius, period, phase in [(499, 31557600, 0), (760, 59355072, 2), (300, 7600000, 1)]]
+        self.lines = [LinearTrajectory((0.0, 10.0), (0.5, 0.0)), LinearTrajectory((-3.0, 2.0), (0.0, -0.1), epoch=5)]
+        self.table = TabulatedTrajectory([0, 10, 30], [(0, 0), (10, 0), (10, 20)])
+
+    def test_linear_position(self):
+        assert LinearTrajectory(10, -0.5).position(4) == 8
+        assert self.lines[1].position(15) == (-3, 1)
+
+    def test_trajectories_must_define_position(self):
+        with raises(TypeError):
+            Trajectory()
+
+    def test_tabulated_position_interpolates_and_holds(self):
+        assert self.table.position(5) == (5, 0)
+        assert self.table.position(20) == (10, 10)
+        assert self.table.position(-5) == (0, 0)
+        assert self.table.position(100) == (10, 20)
+
+    def test_periodic_position_wraps(self):
+        orbit = TabulatedTrajectory([0, 1, 2, 3], [(1, 0), (0, 1), (-1, 0), (0, -1)], period=4)
+        assert orbit.position(3.5) == (0.5, -0.5)
+        assert orbit.position(5) == (0, 1)
+
+    def test_positions_match_individual_positions(self):
+        trajectories = self.orbits + self.lines + [self.table]
+        batch = Trajectories(trajectories)
+        generator = Random(1)
+        times = [generator.uniform(-100, 1e8) for trajectory in trajectories]
+        from numpy import array
+        positions = batch.positions(array(times))
+        for trajectory, time, position in zip(trajectories, times, positions):
+            assert tuple(position) == approx(trajectory.position(time))
+
+    def test_arrival_times_in_one_dimension(self):
+        receding, approaching = LinearTrajectory(10, 0.5), LinearTrajectory(10, -0.5)
+        arrival_times = Trajectories([receding, approaching]).arrival_times(0, 0)
+        assert list(arrival_times) == approx([20, 20 / 3])
+
+    def test_arrival_times_solve_light_cone(self):
+        trajectories = self.orbits + self.lines
+        source, emission_time = (100.0, -50.0), 1e6
+        arrival_times = Trajectories(trajectories).arrival_times(source, emission_time)
+        for trajectory, arrival_time in zip(trajectories, arrival_times):
+            assert dist(trajectory.position(arrival_time), source) == approx(arrival_time - emission_time)
+
+    def test_faster_than_signal_does_not_converge(self):
+        with raises(ValueError):
+            Trajectories([LinearTrajectory(10, 2)]).arrival_times(0, 0)
+
+class TestMovingAgents(object):
+
+    def setup(self):
+        reset_simulation()
+        set_spatial_boundary(-100, 100)
+
+    def test_moving_agent_receives_where_transmission_catches_it(self):
+        source = Agent('source', 0)
+        mover = Agent('mover', LinearTrajectory(10, 0.5))
+        add_agent(source)
+        add_agent(mover)
+        assert mover.location == 10
+        assert mover.location_at(4) == 12
+        transmission = Transmission('transmission', source, 0)
+        assert transmission.reception_time(mover) == approx(20)
+        with patch.object(mover, 'react') as mover_react:
+            transmit(transmission)
+            advance_time(19.9)
+            assert not mover_react.called
+            advance_time(0.2)
+            mover_react.assert_called_once_with(approx(20), transmission)
+
+    def test_moving_source_transmits_from_where_it_is(self):
+        source = Agent('source', LinearTrajectory(0, 0.5))
+        target = Agent('target', 10)
+        add_agent(source)
+        add_agent(target)
+        transmission = Transmission('transmission', source, 4)
+        assert transmission.source == 2
+        assert transmission.reception_time(target) == 12
+
+    def test_moving_agents_are_not_in_static_indices(self):
+        mover = Agent('mover', LinearTrajectory(10, 0.5))
+        add_agent(mover)
+        assert agents_located_in(-100, 100) == []
+        remove_agent('mover')
+        assert 'mover' not in all_agent_ids()
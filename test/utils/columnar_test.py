@@ -0,0 +1,64 @@
+from io import BytesIO
+from subprocess import run
+from sys import executable
+
+from numpy import array, arange, memmap
+
+from test.base import *
+
+class TestColumnarResults(object):
+
+    def setup(self):
+        self.results = (
+            array([1.0, 2.0]),
+            array([0.5, 1.5, 2.5]),
+            arange(12.0).reshape(2, 3, 2),
+            7.0,
+            ['ragged', [1, 2]],
+        )
+
+    def _assert_round_trip(self, results):
+        assert results[0].tolist() == [1.0, 2.0]
+        assert results[1].tolist() == [0.5, 1.5, 2.5]
+        assert results[2].tolist() == arange(12.0).reshape(2, 3, 2).tolist()
+        assert results[3] == 7.0
+        assert results[4] == ['ragged', [1, 2]]
+
+    def test_round_trip_through_file_is_memory_mapped(self, tmpdir):
+        path = str(tmpdir.join('results.dat'))
+        with open(path, 'wb') as output_file:
+            write_results(self.results, output_file, format='columnar')
+        with open(path, 'rb') as input_file:
+            results = read_results(input_file)
+        self._assert_round_trip(results)
+        assert isinstance(results[2], memmap)
+        assert results[2][1, 2, 1] == 11.0
+
+    def test_round_trip_through_stream(self):
+        output_file = BytesIO()
+        write_results(self.results, output_file, format='columnar')
+        self._assert_round_trip(read_columnar(data=output_file.getvalue()))
+
+    def test_round_trip_through_unnamed_stream(self):
+        output_file = BytesIO()
+        write_results(self.results, output_file, format='columnar')
+        output_file.seek(0)
+        results = read_results(output_file)
+        self._assert_round_trip(results)
+        assert not isinstance(results[2], memmap)
+
+    def test_round_trip_through_standard_input(self, tmpdir):
+        path = str(tmpdir.join('results.dat'))
+        with open(path, 'wb') as output_file:
+            write_results(self.results, output_file, format='columnar')
+        script = "import sys; from hashwars.utils import read_results; print(read_results(sys.stdin.buffer)[2].sum())"
+        with open(path, 'rb') as input_file:
+            output = run([executable, '-c', script], stdin=input_file, capture_output=True, text=True, check=True).stdout
+        assert float(output) == 66.0
+
+    def test_pickled_results_are_still_read(self, tmpdir):
+        path = str(tmpdir.join('results.dat'))
+        with open(path, 'wb') as output_file:
+            write_results(self.results, output_file)
+        with open(path, 'rb') as input_file:
+            self._assert_round_trip(read_results(input_file))
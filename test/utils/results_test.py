@@ -0,0 +1,24 @@
+from test.base import *
+
+class TestAppendedResults(object):
+
+    def test_reads_nothing_from_missing_file(self, tmpdir):
+        assert read_appended_results(str(tmpdir.join('missing.dat'))) == []
+
+    def test_reads_appended_results_in_order(self, tmpdir):
+        path = str(tmpdir.join('results.dat'))
+        with open(path, 'ab') as output_file:
+            append_result((1.0, 2.0, 0.5), output_file)
+        with open(path, 'ab') as output_file:
+            append_result((3.0, 4.0, 0.25), output_file)
+        assert read_appended_results(path) == [(1.0, 2.0, 0.5), (3.0, 4.0, 0.25)]
+
+    def test_truncates_partially_written_result(self, tmpdir):
+        path = str(tmpdir.join('results.dat'))
+        with open(path, 'ab') as output_file:
+            append_result((1.0, 2.0, 0.5), output_file)
+            size = output_file.tell()
+            output_file.write(dumps((3.0, 4.0, 0.25))[:-3])
+        assert read_appended_results(path) == [(1.0, 2.0, 0.5)]
+        with open(path, 'rb') as input_file:
+            assert len(input_file.read()) == size